@@ -0,0 +1,184 @@
+"""Append-only attendance journal with an on-demand Excel exporter.
+
+Attendance events are appended to a line-delimited JSON journal, one record per
+line with an increasing sequence number, and fsync'ed in batches. Appending costs
+the same no matter how many lectures the workbook already holds, and a crash can
+at most lose the last unsynced batch instead of corrupting the workbook.
+The .xls/.xlsx sheets are materialized from the journal on shutdown, or on demand:
+
+    python attendance_journal.py attendance_excel.journal attendance_excel.xls
+"""
+import json
+import os
+import sys
+import time
+
+# Journal fields and the sheet column each one is written to
+COLUMNS = [
+    ('name', 'Name'),
+    ('status', 'Status'),
+    ('timestamp', 'Timestamp'),
+    ('attendance_count', 'Attendance Count')
+]
+
+# Excel limits sheet names to 31 characters
+MAX_SHEET_NAME = 31
+
+
+def read_journal(journal_path):
+    """Yield the records of a journal in sequence order, skipping a torn last line"""
+    if not os.path.exists(journal_path):
+        return
+
+    with open(journal_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Only the last line can be incomplete, after a crash in the middle of a write
+                continue
+
+
+def _last_sequence(journal_path):
+    """Sequence number of the last complete record, read from the tail of the journal"""
+    if not os.path.exists(journal_path):
+        return 0
+
+    with open(journal_path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        block = 4096
+        while True:
+            file.seek(max(0, size - block))
+            lines = file.read().splitlines()
+            # The first line may be cut off by the seek unless the whole file was read
+            if block < size:
+                lines = lines[1:]
+            for line in reversed(lines):
+                try:
+                    return json.loads(line)['seq']
+                except (ValueError, KeyError):
+                    continue
+            if block >= size:
+                return 0
+            block *= 2
+
+
+class AttendanceJournal:
+    """Append-only journal of attendance records, fsync'ed every sync_every records or sync_interval seconds"""
+
+    def __init__(self, journal_path, sync_every=16, sync_interval=1.0):
+        self.journal_path = journal_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.sequence = _last_sequence(journal_path)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.file = open(journal_path, 'a', encoding='utf-8')
+
+        # Terminate a line torn by a crash so the next record starts on its own line
+        if self.file.tell() > 0:
+            with open(journal_path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    self.file.write('\n')
+
+    def append(self, **record):
+        """Append one record, e.g. append(lecture=..., name=..., status=..., timestamp=...)"""
+        self.sequence += 1
+        self.file.write(json.dumps({'seq': self.sequence, **record}) + '\n')
+        self.unsynced += 1
+
+        if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+        return self.sequence
+
+    def sync(self):
+        """Make every appended record durable"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+
+def _read_existing_sheets(excel_file):
+    """Return {sheet name: rows} for every sheet already in the workbook"""
+    if not os.path.exists(excel_file):
+        return {}
+
+    sheets = {}
+    if excel_file.endswith('.xlsx'):
+        import openpyxl
+        workbook = openpyxl.load_workbook(excel_file, read_only=True)
+        for worksheet in workbook.worksheets:
+            sheets[worksheet.title] = [list(row) for row in worksheet.iter_rows(values_only=True)]
+        workbook.close()
+    else:
+        import xlrd
+        workbook = xlrd.open_workbook(excel_file, formatting_info=False)
+        for worksheet in workbook.sheets():
+            sheets[worksheet.name] = [worksheet.row_values(row) for row in range(worksheet.nrows)]
+    return sheets
+
+
+def _journal_sheets(journal_path):
+    """Return {lecture name: rows} built from the journal records, in journal order"""
+    records = {}
+    for record in read_journal(journal_path):
+        records.setdefault(str(record.get('lecture', 'Sheet1'))[:MAX_SHEET_NAME], []).append(record)
+
+    sheets = {}
+    for lecture, lecture_records in records.items():
+        columns = [(field, title) for field, title in COLUMNS if any(field in record for record in lecture_records)]
+        rows = [[title for _, title in columns]]
+        for record in lecture_records:
+            rows.append([record.get(field, '') for field, _ in columns])
+        sheets[lecture] = rows
+    return sheets
+
+
+def export_workbook(journal_path, excel_file):
+    """Write one sheet per lecture in the journal to the workbook, keeping its other sheets.
+
+    The workbook is written to a temporary file and then moved into place, so it is
+    never left half written.
+    """
+    sheets = _read_existing_sheets(excel_file)
+    sheets.update(_journal_sheets(journal_path))
+    if not sheets:
+        sheets['Sheet1'] = []
+
+    temp_file = excel_file + '.tmp'
+    if excel_file.endswith('.xlsx'):
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        for sheet_name, rows in sheets.items():
+            worksheet = workbook.create_sheet(sheet_name)
+            for row in rows:
+                worksheet.append(row)
+        workbook.save(temp_file)
+    else:
+        from xlwt import Workbook
+        workbook = Workbook()
+        for sheet_name, rows in sheets.items():
+            worksheet = workbook.add_sheet(sheet_name)
+            for row_index, row in enumerate(rows):
+                for column_index, value in enumerate(row):
+                    if value is not None:
+                        worksheet.write(row_index, column_index, value)
+        workbook.save(temp_file)
+
+    os.replace(temp_file, excel_file)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python attendance_journal.py <journal file> <excel file>')
+        sys.exit(1)
+    export_workbook(sys.argv[1], sys.argv[2])
+    print(f"Exported {sys.argv[1]} to {sys.argv[2]}")
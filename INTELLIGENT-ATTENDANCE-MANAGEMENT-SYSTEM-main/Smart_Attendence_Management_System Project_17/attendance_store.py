@@ -0,0 +1,117 @@
+import os
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock(file):
+    """Block until this process holds the exclusive lock of the attendance file"""
+    if fcntl:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(file):
+    if fcntl:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _parse_line(line):
+    """Return (name, date) of a "name, YYYY-MM-DD HH:MM:SS, present" line, or None"""
+    parts = line.strip().rsplit(', ', 2)
+    if len(parts) != 3:
+        return None
+    return parts[0], parts[1][:10]
+
+
+class AttendanceStore:
+    """Attendance file with an in-memory set of the names already marked today.
+
+    The set is rebuilt at startup by reading the file backwards only as far as
+    today's lines go, so checking whether someone is already marked is O(1)
+    instead of reading the whole file. Appends are made under an exclusive file
+    lock after catching up with lines other camera processes appended, so two
+    processes sharing the file never mark the same person twice in a day.
+    """
+
+    def __init__(self, attendance_file):
+        self.attendance_file = attendance_file
+        open(attendance_file, 'a').close()
+        self._load_today()
+
+    def _load_today(self):
+        """Build today's set from the tail of the file, stopping at the first older line"""
+        self.today = str(datetime.now().date())
+        self.marked = set()
+
+        with open(self.attendance_file, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            self.offset = file.tell()  # Everything before this offset has been indexed
+
+            position = self.offset
+            remainder = b''
+            block_size = 8192
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                file.seek(position)
+                lines = (file.read(read_size) + remainder).split(b'\n')
+
+                # The first piece may be the end of a line that starts in an earlier block
+                remainder = lines.pop(0) if position > 0 else b''
+                if not self._index_lines(reversed(lines)):
+                    return
+
+    def _index_lines(self, lines):
+        """Add today's names from the lines (newest first), return False once an older day is reached"""
+        for line in lines:
+            parsed = _parse_line(line.decode('utf-8', errors='replace'))
+            if not parsed:
+                continue
+            name, date = parsed
+            if date < self.today:
+                return False
+            if date == self.today:
+                self.marked.add(name)
+        return True
+
+    def is_marked(self, name):
+        if str(datetime.now().date()) != self.today:
+            # A new day started, nobody is marked yet
+            self._load_today()
+        return name in self.marked
+
+    def mark(self, name):
+        """Append an attendance line for name unless it is already marked today, return whether it was added"""
+        if self.is_marked(name):
+            return False
+
+        with open(self.attendance_file, 'a+b') as file:
+            _lock(file)
+            try:
+                # Catch up with lines other processes appended since the last read
+                file.seek(self.offset)
+                self._index_lines(file.read().split(b'\n'))
+                if name in self.marked:
+                    self.offset = file.tell()
+                    return False
+
+                # Mark attendance with timestamp
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                file.seek(0, os.SEEK_END)
+                file.write(f"{name}, {timestamp}, present\n".encode('utf-8'))
+                file.flush()
+                self.offset = file.tell()
+                self.marked.add(name)
+                return True
+            finally:
+                _unlock(file)
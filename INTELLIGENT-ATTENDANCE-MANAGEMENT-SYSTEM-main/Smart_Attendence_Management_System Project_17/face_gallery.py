@@ -0,0 +1,103 @@
+import os
+from collections import namedtuple
+
+import face_recognition
+import numpy as np
+
+# Size of the encodings produced by face_recognition.face_encodings
+ENCODING_SIZE = 128
+
+# Image files that are loaded as known faces
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+# Result of matching one detected face against the gallery
+FaceMatch = namedtuple('FaceMatch', ['name', 'distance', 'accepted'])
+
+
+def encode_image_file(image_path):
+    """Return the encoding of the first face in an image file, or None if it has no face"""
+    person_image = face_recognition.load_image_file(image_path)
+    person_encodings = face_recognition.face_encodings(person_image)
+    if not person_encodings:
+        print(f"No face found in {image_path}, skipping.")
+        return None
+    return person_encodings[0]
+
+
+class FaceGallery:
+    """Known faces stored as one contiguous float32 matrix with a parallel name array.
+
+    All faces found in a frame are matched with a single (faces x gallery) distance
+    computation instead of calling compare_faces and face_distance once per face.
+    """
+
+    def __init__(self, names=None, encodings=None, tolerance=0.6):
+        self.tolerance = tolerance
+        self.names = np.array(names if names is not None else [], dtype=object)
+
+        if encodings is None or len(encodings) == 0:
+            encodings = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+
+        # No copy is made when the encodings are already a contiguous float32 array
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+        self._squared_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_folder(cls, image_folder, tolerance=0.6):
+        """Build a gallery from a folder of images named after each person"""
+        names = []
+        encodings = []
+
+        for file_name in sorted(os.listdir(image_folder)):
+            if not file_name.endswith(IMAGE_EXTENSIONS):  # Check for image files
+                continue
+
+            encoding = encode_image_file(os.path.join(image_folder, file_name))
+            if encoding is None:
+                continue
+
+            # Use the file name (without extension) as the person's name
+            names.append(os.path.splitext(file_name)[0])
+            encodings.append(encoding)
+
+        return cls(names, encodings, tolerance=tolerance)
+
+    def add(self, name, encoding):
+        """Add a single known face to the gallery"""
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_SIZE)
+        self.names = np.append(self.names, np.array([name], dtype=object))
+        self.encodings = np.concatenate([self.encodings, encoding])
+        self._squared_norms = np.append(self._squared_norms, np.dot(encoding[0], encoding[0]))
+
+    def distances(self, face_encodings):
+        """Euclidean distance from every face to every known face, shape (faces, gallery)"""
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, computed for all pairs with one matrix product
+        squared = (np.einsum('ij,ij->i', faces, faces)[:, None]
+                   + self._squared_norms[None, :]
+                   - 2.0 * faces @ self.encodings.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def match(self, face_encodings):
+        """Return the best FaceMatch for every face encoding found in a frame"""
+        if len(face_encodings) == 0:
+            return []
+
+        if len(self) == 0:
+            return [FaceMatch("Unknown", float('inf'), False) for _ in face_encodings]
+
+        distances = self.distances(face_encodings)
+        best_indices = np.argmin(distances, axis=1)
+        best_distances = distances[np.arange(len(best_indices)), best_indices]
+
+        matches = []
+        for index, distance in zip(best_indices, best_distances):
+            accepted = bool(distance <= self.tolerance)
+            name = self.names[index] if accepted else "Unknown"
+            matches.append(FaceMatch(name, float(distance), accepted))
+        return matches
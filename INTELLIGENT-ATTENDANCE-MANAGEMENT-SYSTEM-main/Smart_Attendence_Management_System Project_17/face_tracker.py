@@ -0,0 +1,125 @@
+import itertools
+
+
+def box_iou(box_a, box_b):
+    """Intersection over union of two (top, right, bottom, left) face boxes"""
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    if intersection == 0:
+        return 0.0
+
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    return intersection / float(area_a + area_b - intersection)
+
+
+class Track:
+    """A face followed across frames with the identity it was last matched to"""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.name = "Unknown"
+        self.match = None
+        self.last_encoded = None  # Frame number of the last encoding, None until the first one
+        self.pending = False  # Sent for encoding and not identified yet
+        self.missed = 0
+
+
+class FaceTracker:
+    """Follows faces between frames by IoU association of their (downscaled) boxes.
+
+    Faces only need to be encoded when they first appear, and again every
+    reverify_interval frames (unknown faces every unknown_retry_interval frames),
+    instead of on every processed frame.
+    """
+
+    def __init__(self, iou_threshold=0.3, reverify_interval=30, unknown_retry_interval=5, max_missed=5):
+        self.iou_threshold = iou_threshold
+        self.reverify_interval = reverify_interval
+        self.unknown_retry_interval = unknown_retry_interval
+        self.max_missed = max_missed
+        self.tracks = []
+        self.track_ids = itertools.count(1)
+
+        self.frames_processed = 0
+        self.frames_encoded = 0
+        self.faces_encoded = 0
+
+    def _needs_encoding(self, track):
+        if track.pending:
+            return False  # Its encoding is still on the way, e.g. in a pipeline worker
+        if track.last_encoded is None:
+            return True
+        interval = self.reverify_interval if track.match and track.match.accepted else self.unknown_retry_interval
+        return self.frames_processed - track.last_encoded >= interval
+
+    def update(self, face_locations):
+        """Associate the faces found in a frame with the tracks of the previous frames.
+
+        Returns the track of every face location, in the same order, and the indices
+        of the faces that need to be encoded on this frame.
+        """
+        self.frames_processed += 1
+
+        # Greedily pair the boxes with the highest overlap first
+        pairs = []
+        for face_index, box in enumerate(face_locations):
+            for track in self.tracks:
+                iou = box_iou(box, track.box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, face_index, track))
+        pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+        face_tracks = [None] * len(face_locations)
+        matched_tracks = set()
+        for iou, face_index, track in pairs:
+            if face_tracks[face_index] is None and track.id not in matched_tracks:
+                face_tracks[face_index] = track
+                matched_tracks.add(track.id)
+
+        # Forget faces that have not been seen for a while
+        for track in self.tracks:
+            if track.id not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for face_index, box in enumerate(face_locations):
+            track = face_tracks[face_index]
+            if track is None:
+                track = Track(next(self.track_ids), box)
+                face_tracks[face_index] = track
+                self.tracks.append(track)
+            track.box = box
+            track.missed = 0
+
+        to_encode = [index for index, track in enumerate(face_tracks) if self._needs_encoding(track)]
+        for index in to_encode:
+            face_tracks[index].pending = True
+        if to_encode:
+            self.frames_encoded += 1
+            self.faces_encoded += len(to_encode)
+        return face_tracks, to_encode
+
+    def identify(self, track, match):
+        """Store the result of matching a freshly encoded face on its track.
+
+        Returns True when the track's identity is confirmed for the first time or has
+        changed, False when a re-verification only confirmed the identity it had.
+        """
+        changed = track.last_encoded is None or track.name != match.name
+        track.pending = False
+        track.match = match
+        track.name = match.name
+        track.last_encoded = self.frames_processed
+        return changed
+
+    def cancel(self, track):
+        """Give up on a face's pending encoding (e.g. its worker failed) so it is encoded again"""
+        track.pending = False
+
+    def stats(self):
+        return f"{self.frames_processed} frames processed, {self.frames_encoded} frames encoded ({self.faces_encoded} faces)"
@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+
+from face_gallery import ENCODING_SIZE, IMAGE_EXTENSIONS, FaceGallery, encode_image_file
+
+# Folder created inside the image folder to hold the cached encodings
+CACHE_DIR_NAME = '.gallery_cache'
+
+
+class GalleryCache:
+    """On-disk cache of the encodings of an image folder.
+
+    The encodings are stored as a .npy matrix next to a JSON index that records the
+    file name, mtime and size each row was computed from. On startup only new or
+    changed images are encoded again, and when nothing changed the matrix is
+    memory-mapped straight into the gallery without being copied.
+    """
+
+    def __init__(self, image_folder, cache_dir=None):
+        self.image_folder = image_folder
+        self.cache_dir = cache_dir or os.path.join(image_folder, CACHE_DIR_NAME)
+        self.matrix_path = os.path.join(self.cache_dir, 'encodings.npy')
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+
+    def _read_cache(self):
+        """Return the cached index entries and the memory-mapped matrix, or empty ones if unusable"""
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return [], None
+
+        # The matrix is written before the index, so a crash in between leaves them out of step
+        if matrix.shape != (index['rows'], ENCODING_SIZE) or matrix.dtype != np.float32:
+            return [], None
+        return index['entries'], matrix
+
+    def _write_cache(self, entries, matrix):
+        """Atomically replace the cached matrix and then its index"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        temp_path = self.matrix_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.save(file, matrix)
+        os.replace(temp_path, self.matrix_path)
+
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'rows': len(matrix), 'entries': entries}, file)
+        os.replace(temp_path, self.index_path)
+
+    def load(self, tolerance=0.6):
+        """Return a FaceGallery for the image folder, encoding only new or changed images"""
+        cached_entries, cached_matrix = self._read_cache()
+        cached = {entry['file']: entry for entry in cached_entries}
+
+        entries = []
+        names = []
+        sources = []  # Cached row number or freshly computed encoding of every known face, in order
+        changed = False
+
+        for file_name in sorted(os.listdir(self.image_folder)):
+            if not file_name.endswith(IMAGE_EXTENSIONS):  # Check for image files
+                continue
+
+            stat = os.stat(os.path.join(self.image_folder, file_name))
+            entry = {
+                'file': file_name,
+                # Use the file name (without extension) as the person's name
+                'name': os.path.splitext(file_name)[0],
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'row': None
+            }
+
+            previous = cached.get(file_name)
+            if previous and previous['mtime'] == entry['mtime'] and previous['size'] == entry['size']:
+                source = previous['row']
+            else:
+                # New or changed image, encode it again
+                changed = True
+                source = encode_image_file(os.path.join(self.image_folder, file_name))
+
+            if source is not None:
+                entry['row'] = len(sources)
+                names.append(entry['name'])
+                sources.append(source)
+            entries.append(entry)
+
+        # Removed images also require the matrix to be rewritten
+        if not changed and len(entries) == len(cached_entries) and sources == list(range(len(sources))):
+            return FaceGallery(names, cached_matrix, tolerance=tolerance)
+
+        matrix = np.empty((len(sources), ENCODING_SIZE), dtype=np.float32)
+        for row, source in enumerate(sources):
+            matrix[row] = cached_matrix[source] if isinstance(source, int) else source
+
+        # Release the old mapping before the file underneath it is replaced
+        del cached_matrix
+        self._write_cache(entries, matrix)
+        return FaceGallery(names, np.load(self.matrix_path, mmap_mode='r'), tolerance=tolerance)
@@ -0,0 +1,331 @@
+"""Offline-first kiosk agent: a local punch queue synced to the backend in batches.
+
+The recognition pipeline never waits for the network. Every punch is committed to
+a local SQLite queue in WAL mode first, and the agent sends the queue to
+POST /api/attendance/record/batch in gzip'ed batches. A batch keeps its
+Idempotency-Key until the backend acknowledges it, so after a lost response the
+same batch is sent again under the same key and the backend replays its results
+instead of applying it twice. Delivery is at least once. Failed attempts are
+retried with exponential backoff and full jitter.
+
+    python recognition_pipeline.py --queue kiosk_queue.db --roster roster.json
+    python kiosk_agent.py --queue kiosk_queue.db --url http://server:5000 --email kiosk@example.com --password ...
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS punches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    attendance_type TEXT NOT NULL,
+    location TEXT,
+    queued_at REAL NOT NULL,
+    batch_key TEXT,
+    rejected TEXT
+);
+CREATE INDEX IF NOT EXISTS punches_batch_key ON punches (batch_key);
+"""
+
+# Responses after which the same batch is sent again, every other 4xx rejects it for good
+RETRY_STATUSES = {401, 408, 429}
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (seconds or an HTTP-date), None if missing or unreadable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def student_id_for(name, roster=None):
+    """Backend student ID of a gallery name: from the roster, else a leading number ("12_Alice")"""
+    if roster and name in roster:
+        return int(roster[name])
+    prefix = name.split('_')[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+class PunchQueue:
+    """Durable FIFO of punches waiting to be synced, shared by the pipeline and the agent.
+
+    Punches are committed with synchronous=FULL before enqueue() returns. A batch is
+    claimed by stamping its rows with a new key; the rows stay in the queue under that
+    key until ack() deletes them, and next_batch() hands out the same unacknowledged
+    batch again, so a crash at any point resends it under the same key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=FULL')
+        self.connection.executescript(SCHEMA)
+
+    def enqueue(self, student_id, timestamp=None, attendance_type='face', location=None):
+        """Queue one punch, timestamp defaults to now (local time, ISO 8601)"""
+        timestamp = timestamp or datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            cursor = self.connection.execute(
+                'INSERT INTO punches (student_id, timestamp, attendance_type, location, queued_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (student_id, timestamp, attendance_type, location, time.time())
+            )
+        return cursor.lastrowid
+
+    def next_batch(self, size):
+        """Return (key, rows) of the batch to send next, or (None, []) when nothing is queued.
+
+        Rows are (id, student_id, timestamp, attendance_type, location, queued_at).
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT batch_key FROM punches WHERE batch_key IS NOT NULL AND rejected IS NULL '
+                'ORDER BY id LIMIT 1'
+            ).fetchone()
+            if row:
+                key = row[0]
+            else:
+                key = uuid.uuid4().hex
+                self.connection.execute('BEGIN IMMEDIATE')
+                try:
+                    self.connection.execute(
+                        'UPDATE punches SET batch_key = ? WHERE id IN '
+                        '(SELECT id FROM punches WHERE batch_key IS NULL ORDER BY id LIMIT ?)',
+                        (key, size)
+                    )
+                    self.connection.execute('COMMIT')
+                except BaseException:
+                    self.connection.execute('ROLLBACK')
+                    raise
+
+            rows = self.connection.execute(
+                'SELECT id, student_id, timestamp, attendance_type, location, queued_at '
+                'FROM punches WHERE batch_key = ? ORDER BY id',
+                (key,)
+            ).fetchall()
+        return (key, rows) if rows else (None, [])
+
+    def ack(self, key):
+        """Forget a batch the backend has recorded"""
+        with self.lock:
+            self.connection.execute('DELETE FROM punches WHERE batch_key = ?', (key,))
+
+    def reject(self, key, reason):
+        """Keep a batch the backend refused for inspection, and stop sending it"""
+        with self.lock:
+            self.connection.execute('UPDATE punches SET rejected = ? WHERE batch_key = ?', (reason, key))
+
+    def pending(self):
+        """Number of punches waiting and the time the oldest one was queued (None if empty)"""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT COUNT(*), MIN(queued_at) FROM punches WHERE rejected IS NULL'
+            ).fetchone()
+
+    def close(self):
+        self.connection.close()
+
+
+class SyncError(Exception):
+    """A batch could not be delivered this time and will be sent again"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AuthError(Exception):
+    """The backend refused the token or the login, sending again cannot succeed"""
+
+
+class SyncStats:
+    """Counters and per-punch sync lag (seconds from enqueue to acknowledgement)"""
+
+    def __init__(self):
+        self.batches = 0
+        self.punches = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.failures = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.lags = []
+
+    def summary(self):
+        lags = sorted(self.lags) or [0.0]
+        percentile = lambda p: lags[min(len(lags) - 1, int(p * len(lags)))]
+        ratio = self.raw_bytes / self.sent_bytes if self.sent_bytes else 0
+        return (f"{self.punches} punches in {self.batches} batches ({self.replayed} replayed, "
+                f"{self.rejected} rejected), {self.failures} failed attempts, "
+                f"gzip {ratio:.1f}x, lag p50 {percentile(0.5):.2f}s p95 {percentile(0.95):.2f}s "
+                f"max {lags[-1]:.2f}s")
+
+
+class KioskAgent:
+    """Sends the punch queue to the backend until stopped, with a token or by logging in with email and password"""
+
+    def __init__(self, queue, url, token=None, email=None, password=None, batch_size=200,
+                 timeout=10.0, backoff_base=0.5, backoff_max=60.0, idle_interval=1.0):
+        if not token and not (email and password):
+            # Nothing to authenticate with, every sync would fail and be retried forever
+            raise ValueError("A token, or an email and password to log in with, is required")
+        self.queue = queue
+        self.url = url.rstrip('/')
+        self.token = token
+        self.email = email
+        self.password = password
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_interval = idle_interval
+        self.stop_event = threading.Event()
+        self.stats = SyncStats()
+
+    def _request(self, path, body, headers):
+        """POST body, return (status, headers, parsed JSON) for any HTTP status"""
+        request = urllib.request.Request(self.url + path, data=body, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as error:
+            try:
+                payload = json.loads(error.read() or b'null')
+            except ValueError:
+                payload = None
+            return error.code, error.headers, payload
+        except (urllib.error.URLError, OSError, ValueError) as error:
+            raise SyncError(f"Backend unreachable: {error}")
+
+    def _login(self):
+        body = json.dumps({'email': self.email, 'password': self.password}).encode('utf-8')
+        status, _, payload = self._request('/api/auth/login', body, {'Content-Type': 'application/json'})
+        if status in (400, 401):
+            raise AuthError(f"Login as {self.email} was refused with HTTP {status}")
+        if status != 200:
+            raise SyncError(f"Login failed with HTTP {status}")
+        self.token = payload['access_token']
+
+    def sync_once(self):
+        """Send the next batch, return the number of punches acknowledged (0 when the queue is empty)"""
+        key, rows = self.queue.next_batch(self.batch_size)
+        if not rows:
+            return 0
+        if self.token is None:
+            self._login()
+
+        events = [
+            {'student_id': student_id, 'timestamp': timestamp, 'attendance_type': attendance_type,
+             'location': location}
+            for _, student_id, timestamp, attendance_type, location, _ in rows
+        ]
+        raw = json.dumps({'events': events}).encode('utf-8')
+        body = gzip.compress(raw)
+        status, headers, payload = self._request('/api/attendance/record/batch', body, {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Idempotency-Key': key,
+            'Authorization': f'Bearer {self.token}'
+        })
+        self.stats.raw_bytes += len(raw)
+        self.stats.sent_bytes += len(body)
+
+        if status == 200:
+            self.queue.ack(key)
+            now = time.time()
+            self.stats.batches += 1
+            self.stats.punches += len(rows)
+            self.stats.replayed += bool(payload and payload.get('replayed'))
+            self.stats.lags.extend(now - row[5] for row in rows)
+            return len(rows)
+
+        if status == 401:
+            if not self.email:
+                # Sending again with the same dead token would fail forever, the batch stays queued
+                raise AuthError("Backend refused the access token and no --email is set to log in again")
+            self.token = None  # Expired token, log in again on the next attempt
+        if status in RETRY_STATUSES or status >= 500:
+            raise SyncError(f"HTTP {status}", retry_after_seconds(headers.get('Retry-After') if headers else None))
+
+        # The backend will never accept this batch as it is, keep it aside instead of blocking the queue
+        error = payload.get('error') if isinstance(payload, dict) else None
+        self.queue.reject(key, f"HTTP {status}: {error}")
+        self.stats.rejected += 1
+        return 0
+
+    def run(self):
+        """Sync until stop(), backing off exponentially (with full jitter) while the backend fails.
+
+        Raises AuthError when the token is refused and there are no credentials to get a new
+        one, or when the backend refuses the credentials.
+        """
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                sent = self.sync_once()
+                failures = 0
+                if not sent and not self.queue.pending()[0]:
+                    self.stop_event.wait(self.idle_interval)
+            except SyncError as error:
+                failures += 1
+                self.stats.failures += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** failures))
+                self.stop_event.wait(max(delay, error.retry_after or 0))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync the kiosk punch queue to the attendance backend')
+    parser.add_argument('--queue', default='kiosk_queue.db', help='SQLite punch queue written by the pipeline')
+    parser.add_argument('--url', required=True, help='backend base URL, e.g. http://server:5000')
+    parser.add_argument('--token', default=os.getenv('KIOSK_TOKEN'), help='access token (or log in with --email)')
+    parser.add_argument('--email', default=os.getenv('KIOSK_EMAIL'))
+    parser.add_argument('--password', default=os.getenv('KIOSK_PASSWORD'))
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--backoff-max', type=float, default=60.0, help='longest wait between retries (seconds)')
+    args = parser.parse_args()
+    if not args.token and not (args.email and args.password):
+        parser.error('give --token, or --email and --password to log in with')
+
+    queue = PunchQueue(args.queue)
+    agent = KioskAgent(queue, args.url, token=args.token, email=args.email, password=args.password,
+                       batch_size=args.batch_size, backoff_max=args.backoff_max)
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        agent.stop()
+    except AuthError as error:
+        print(f"Stopped: {error}. Queued punches are kept, restart with a valid --token or --email and --password")
+    finally:
+        queue.close()
+    print(agent.stats.summary())
+
+
+if __name__ == '__main__':
+    main()
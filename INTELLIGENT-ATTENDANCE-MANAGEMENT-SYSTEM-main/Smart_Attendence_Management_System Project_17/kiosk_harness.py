@@ -0,0 +1,180 @@
+"""Run the kiosk agent against a local stand-in of the backend with simulated outages.
+
+    python kiosk_harness.py --seconds 20 --rate 50 --outage-every 5 --outage-length 2 --lost-responses 0.1
+
+A producer thread queues punches at --rate per second while the agent syncs them
+to a small Flask app that mimics POST /api/attendance/record/batch (gzip bodies,
+Idempotency-Key replay). The stand-in is down for --outage-length seconds every
+--outage-every seconds, answering 503 or hanging past the agent's timeout, and
+drops the response of a --lost-responses fraction of the batches it did apply.
+At the end it checks that every punch was applied exactly once and reports the
+sync lag and throughput.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from kiosk_agent import KioskAgent, PunchQueue
+
+
+class StandIn:
+    """Backend stand-in: applies batches, replays idempotency keys and fails on a schedule"""
+
+    def __init__(self, outage_every, outage_length, lost_responses, hang_seconds, seed=0):
+        self.outage_every = outage_every
+        self.outage_length = outage_length
+        self.lost_responses = lost_responses
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.applied = {}  # (student_id, timestamp) -> times applied
+        self.applied_at = {}  # (student_id, timestamp) -> wall clock time first applied
+        self.keys = {}  # Idempotency-Key -> stored response
+        self.requests = 0
+        self.outage_responses = 0
+        self.lost = 0
+        self.replays = 0
+        self.app = self._create_app()
+
+    def in_outage(self):
+        return self.outage_every and (time.monotonic() - self.started) % self.outage_every < self.outage_length
+
+    def _create_app(self):
+        app = Flask('kiosk_stand_in')
+
+        @app.route('/api/attendance/record/batch', methods=['POST'])
+        def record_batch():
+            with self.lock:
+                self.requests += 1
+            if self.in_outage():
+                with self.lock:
+                    self.outage_responses += 1
+                    hang = self.random.random() < 0.5
+                if hang:
+                    time.sleep(self.hang_seconds)  # The agent times out first
+                return jsonify({'error': 'Service unavailable'}), 503
+
+            body = request.get_data()
+            if request.content_encoding == 'gzip':
+                body = gzip.decompress(body)
+            events = json.loads(body)['events']
+            key = request.headers.get('Idempotency-Key')
+
+            with self.lock:
+                if key in self.keys:
+                    self.replays += 1
+                    return jsonify({**self.keys[key], 'replayed': True}), 200
+
+                now = time.time()
+                for event in events:
+                    punch = (event['student_id'], event['timestamp'])
+                    self.applied[punch] = self.applied.get(punch, 0) + 1
+                    self.applied_at.setdefault(punch, now)
+                response = {'recorded': len(events), 'failed': 0, 'replayed': False}
+                self.keys[key] = response
+
+                if self.random.random() < self.lost_responses:
+                    # Applied, but the response never reaches the kiosk
+                    self.lost += 1
+                    return jsonify({'error': 'Connection reset'}), 502
+            return jsonify(response), 200
+
+        return app
+
+
+def produce(queue, rate, seconds, produced):
+    """Queue rate punches per second for seconds, recording when each one was queued"""
+    interval = 1.0 / rate
+    deadline = time.monotonic() + seconds
+    student_id = 0
+    next_at = time.monotonic()
+    while time.monotonic() < deadline:
+        student_id += 1  # One punch per student, so (student, timestamp) identifies a punch
+        timestamp = datetime.now().isoformat()
+        queue.enqueue(student_id, timestamp=timestamp)
+        produced[(student_id, timestamp)] = time.time()
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kiosk sync harness with simulated outages')
+    parser.add_argument('--seconds', type=float, default=20, help='how long punches are produced')
+    parser.add_argument('--rate', type=float, default=50, help='punches per second')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--outage-every', type=float, default=5, help='seconds between outages (0: none)')
+    parser.add_argument('--outage-length', type=float, default=2, help='seconds each outage lasts')
+    parser.add_argument('--lost-responses', type=float, default=0.1, help='fraction of applied batches whose response is lost')
+    parser.add_argument('--timeout', type=float, default=1.0, help='agent request timeout (seconds)')
+    parser.add_argument('--backoff-max', type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No line per request
+    stand_in = StandIn(args.outage_every, args.outage_length, args.lost_responses, hang_seconds=args.timeout * 2)
+    server = make_server('127.0.0.1', 0, stand_in.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    queue_path = os.path.join(tempfile.mkdtemp(), 'kiosk_queue.db')
+    pipeline_queue = PunchQueue(queue_path)  # The pipeline and the agent use their own connections
+    agent_queue = PunchQueue(queue_path)
+    agent = KioskAgent(agent_queue, f'http://127.0.0.1:{server.server_port}', token='stand-in',
+                       batch_size=args.batch_size, timeout=args.timeout, backoff_base=0.1,
+                       backoff_max=args.backoff_max, idle_interval=0.05)
+    agent_thread = threading.Thread(target=agent.run)
+
+    produced = {}
+    started = time.time()
+    agent_thread.start()
+    produce(pipeline_queue, args.rate, args.seconds, produced)
+    produced_seconds = time.time() - started
+
+    # Let the agent drain the queue (outages still happen meanwhile)
+    drain_deadline = time.monotonic() + 60
+    while agent_queue.pending()[0] and time.monotonic() < drain_deadline:
+        time.sleep(0.05)
+    finished = time.time()
+    agent.stop()
+    agent_thread.join()
+    server.shutdown()
+
+    applied = stand_in.applied
+    lost = [punch for punch in produced if punch not in applied]
+    duplicated = [punch for punch, count in applied.items() if count > 1]
+    lags = [stand_in.applied_at[punch] - queued_at for punch, queued_at in produced.items() if punch in applied]
+
+    print(f"Produced {len(produced)} punches in {produced_seconds:.1f}s ({args.rate:.0f}/s), "
+          f"outage {args.outage_length:.0f}s every {args.outage_every:.0f}s, "
+          f"{args.lost_responses:.0%} of responses lost")
+    print(f"Stand-in: {stand_in.requests} requests, {stand_in.outage_responses} during outages, "
+          f"{stand_in.lost} responses lost, {stand_in.replays} replayed by idempotency key")
+    print(f"Agent:    {agent.stats.summary()}")
+    print(f"Applied {len(applied)} punches: {len(lost)} lost, {len(duplicated)} applied twice, "
+          f"{agent_queue.pending()[0]} still queued")
+    print(f"Sync lag (queued -> applied): p50 {percentile(lags, 0.5):.2f}s, p95 {percentile(lags, 0.95):.2f}s, "
+          f"max {max(lags, default=0):.2f}s")
+    print(f"Throughput: {len(applied) / (finished - started):.1f} punches/s end to end")
+
+    pipeline_queue.close()
+    agent_queue.close()
+    if lost or duplicated:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""Staged face recognition pipeline for the webcam loop.
+
+A capture thread reads frames into a small drop-oldest queue, a process pool
+runs face detection on several frames at once, the faces are followed between
+frames by a FaceTracker, the pool encodes only the new ones, and a single consumer
+in the main thread matches the faces and writes attendance. The attendance scripts
+run their webcam loops through RecognitionPipeline. Frames can come from a camera,
+a video file or a folder of images, so this module also runs headless for testing,
+marking attendance in the AttendanceStore file of attendenance_02.py:
+
+    python recognition_pipeline.py --source 0
+    python recognition_pipeline.py --source lecture.mp4 --headless --workers 4
+    python recognition_pipeline.py --source frames/ --headless
+    python recognition_pipeline.py --queue kiosk_queue.db --roster roster.json  # Kiosk, see kiosk_agent.py
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import face_recognition
+import numpy as np
+
+from attendance_store import AttendanceStore
+from face_gallery import IMAGE_EXTENSIONS
+from face_tracker import FaceTracker
+from gallery_cache import GalleryCache
+from kiosk_agent import PunchQueue, student_id_for
+
+
+class FrameQueue:
+    """Bounded frame queue that drops the oldest frame instead of blocking a live camera"""
+
+    def __init__(self, max_size, drop_oldest=True):
+        self.frames = deque()
+        self.max_size = max_size
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item):
+        with self.condition:
+            if len(self.frames) >= self.max_size:
+                if self.drop_oldest:
+                    self.frames.popleft()
+                    self.dropped += 1
+                else:
+                    # Files and folders are not live, wait for room so no frame is lost
+                    self.condition.wait_for(lambda: len(self.frames) < self.max_size or self.closed)
+            self.frames.append(item)
+            self.condition.notify_all()
+
+    def get(self, timeout=None):
+        """Return the oldest frame, or None if there is none within the timeout"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.frames or self.closed, timeout)
+            if not self.frames:
+                return None
+            item = self.frames.popleft()
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    @property
+    def finished(self):
+        with self.condition:
+            return self.closed and not self.frames
+
+
+class StageStats:
+    """Item count and throughput of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def record(self, busy_seconds=0.0):
+        self.count += 1
+        self.busy_seconds += busy_seconds
+
+    def record_failure(self):
+        self.failed += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        text = f"{self.name}: {self.count} frames, {rate:.1f} fps"
+        if self.count and self.busy_seconds:
+            text += f", {self.busy_seconds / self.count * 1000:.1f} ms/frame"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+
+def open_source(source):
+    """Return a frame iterator for a camera index, a video file or a folder of images, and whether it is live"""
+    if os.path.isdir(source):
+        def read_folder():
+            for file_name in sorted(os.listdir(source)):
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    frame = cv2.imread(os.path.join(source, file_name))
+                    if frame is not None:
+                        yield frame
+        return read_folder(), False
+
+    live = source.isdigit()
+    video_capture = cv2.VideoCapture(int(source) if live else source)
+
+    def read_video():
+        try:
+            while True:
+                ret, frame = video_capture.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            # Release handle to the webcam or video file
+            video_capture.release()
+    return read_video(), live
+
+
+def detect_faces(rgb_small_frame, model):
+    """Worker process: find all the faces in a frame"""
+    started = time.perf_counter()
+    face_locations = face_recognition.face_locations(rgb_small_frame, model=model)
+    return face_locations, time.perf_counter() - started
+
+
+def encode_faces(rgb_small_frame, face_locations):
+    """Worker process: encode the faces at the given locations of a frame"""
+    started = time.perf_counter()
+    face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+    return face_encodings, time.perf_counter() - started
+
+
+class RecognitionPipeline:
+    """Capture thread -> process pool for detection -> tracking -> process pool for encoding -> frame consumer.
+
+    on_frame(frame, face_locations, tracks, new_faces, face_encodings) is called in
+    the main thread once per frame, in capture order, with the face locations scaled
+    up to the captured frame, the track of every face, the indices of the faces that
+    were encoded (new or due for re-verification) and their encodings. It must call
+    tracker.identify() for each of them, and can return False to stop.
+    """
+
+    def __init__(self, on_frame, source='0', workers=None, queue_size=4, scale=0.25, model='hog', tracker=None):
+        self.on_frame = on_frame
+        self.frames, live = open_source(source)
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = FrameQueue(queue_size, drop_oldest=live)
+        self.scale = scale
+        self.model = model
+        self.tracker = tracker or FaceTracker()
+        self.stopped = threading.Event()
+
+        self.capture_stats = StageStats('capture')
+        self.detect_stats = StageStats('detect')
+        self.encode_stats = StageStats('encode')
+        self.frame_stats = StageStats('match+display')
+
+    def _capture(self):
+        """Capture thread: read frames and shrink them for the detector"""
+        try:
+            for frame in self.frames:
+                if self.stopped.is_set():
+                    break
+
+                # Resize frame of video to a smaller size for faster face recognition processing and
+                # convert it from BGR color (which OpenCV uses) to RGB color (which face_recognition uses)
+                small_frame = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+                rgb_small_frame = np.ascontiguousarray(small_frame[:, :, ::-1])
+
+                self.queue.put((frame, rgb_small_frame))
+                self.capture_stats.record()
+        finally:
+            self.frames.close()
+            self.queue.close()
+
+    def _drop(self, stats, error):
+        # One bad frame must not stop the kiosk, drop it and keep going
+        stats.record_failure()
+        print(f"Dropped a frame: {error}")
+
+    def _track(self, pool, frame, rgb_small_frame, future):
+        """Follow the detected faces from the previous frames and send only the new ones for encoding"""
+        try:
+            face_locations, busy_seconds = future.result()
+        except Exception as error:
+            self._drop(self.detect_stats, error)
+            return None
+        self.detect_stats.record(busy_seconds)
+
+        tracks, new_faces = self.tracker.update(face_locations)
+        future = None
+        if new_faces:
+            future = pool.submit(encode_faces, rgb_small_frame, [face_locations[i] for i in new_faces])
+        return frame, face_locations, tracks, new_faces, future
+
+    def _consume(self, frame, face_locations, tracks, new_faces, future):
+        """Hand one frame with its tracks and new encodings to on_frame"""
+        face_encodings = []
+        if future is not None:
+            try:
+                face_encodings, busy_seconds = future.result()
+            except Exception as error:
+                for face_index in new_faces:
+                    self.tracker.cancel(tracks[face_index])
+                self._drop(self.encode_stats, error)
+                return
+            self.encode_stats.record(busy_seconds)
+
+        started = time.perf_counter()
+        # Scale face locations back up to the size of the captured frame
+        face_locations = [tuple(int(round(value / self.scale)) for value in location)
+                          for location in face_locations]
+        keep_going = self.on_frame(frame, face_locations, tracks, new_faces, face_encodings)
+        self.frame_stats.record(time.perf_counter() - started)
+        if keep_going is False:
+            self.stop()
+
+    def run(self):
+        """Run until the source is exhausted or stop() is called"""
+        detecting = deque()  # (frame, rgb_small_frame, detection future) in capture order
+        encoding = deque()  # (frame, face_locations, tracks, new_faces, encoding future or None) in capture order
+        max_in_flight = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # Start the worker processes before the capture thread so they are not forked mid-capture
+            pool.submit(int).result()
+            capture_thread = threading.Thread(target=self._capture, name='capture', daemon=True)
+            capture_thread.start()
+
+            while not self.stopped.is_set():
+                # Keep every worker busy with the newest frames
+                while len(detecting) + len(encoding) < max_in_flight:
+                    item = self.queue.get(timeout=0 if detecting or encoding else 0.1)
+                    if item is None:
+                        break
+                    frame, rgb_small_frame = item
+                    detecting.append((frame, rgb_small_frame, pool.submit(detect_faces, rgb_small_frame, self.model)))
+
+                # Faces are tracked and consumed in capture order, a frame is consumed as soon as its
+                # encodings are back, else the tracker moves on to the next detected frame meanwhile
+                if encoding and (not detecting or encoding[0][-1] is None or encoding[0][-1].done()):
+                    self._consume(*encoding.popleft())
+                elif detecting:
+                    tracked = self._track(pool, *detecting.popleft())
+                    if tracked is not None:
+                        encoding.append(tracked)
+                elif self.queue.finished:
+                    break
+
+            self.stop()
+            for *_, future in list(detecting) + list(encoding):
+                if future is not None:
+                    future.cancel()
+
+        capture_thread.join(timeout=1)
+
+    def stop(self):
+        self.stopped.set()
+        self.queue.close()
+
+    def report(self):
+        """Per-stage throughput, e.g. for printing after a run"""
+        lines = [
+            self.capture_stats.summary() + f", {self.queue.dropped} dropped",
+            self.detect_stats.summary() + f" across {self.workers} workers",
+            self.encode_stats.summary() + f" with new faces ({self.tracker.stats()})",
+            self.frame_stats.summary()
+        ]
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Staged face recognition attendance pipeline')
+    parser.add_argument('--source', default='0', help='camera index, video file or folder of frames')
+    parser.add_argument('--images', default='images_02', help='folder with one image per known person')
+    parser.add_argument('--attendance-file', default='Smart_Attendenance_Management_System_Project_01/attendance.txt')
+    parser.add_argument('--workers', type=int, default=None, help='detection and encoding processes (default: all cores)')
+    parser.add_argument('--queue-size', type=int, default=4, help='frames buffered between capture and detection')
+    parser.add_argument('--model', default='hog', choices=['hog', 'cnn'])
+    parser.add_argument('--headless', action='store_true', help='do not open a video window')
+    parser.add_argument('--queue', help='also queue punches in this kiosk queue for kiosk_agent.py to sync')
+    parser.add_argument('--roster', help='JSON file mapping gallery names to backend student IDs')
+    args = parser.parse_args()
+
+    known_faces = GalleryCache(args.images).load()
+    face_tracker = FaceTracker()
+    # The same attendance file and once-a-day rule as attendenance_02.py, shared safely with its processes
+    attendance_store = AttendanceStore(args.attendance_file)
+    punch_queue = PunchQueue(args.queue) if args.queue else None
+    roster = {}
+    if args.roster:
+        with open(args.roster) as file:
+            roster = json.load(file)
+
+    def mark_attendance(name):
+        if not attendance_store.mark(name):
+            return
+        print(f"Attendance taken for {name}")
+
+        if punch_queue:
+            student_id = student_id_for(name, roster)
+            if student_id is None:
+                print(f"No student ID for {name}, not queued for the backend")
+            else:
+                punch_queue.enqueue(student_id)
+
+    def process_frame(frame, face_locations, tracks, new_faces, face_encodings):
+        for face_index, match in zip(new_faces, known_faces.match(face_encodings)):
+            if face_tracker.identify(tracks[face_index], match) and match.accepted:
+                mark_attendance(match.name)
+        if args.headless:
+            return True
+
+        for (top, right, bottom, left), track in zip(face_locations, tracks):
+            # Draw a box around the face with a label with the name below it
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
+            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 0, 255), cv2.FILLED)
+            cv2.putText(frame, track.name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 1.0, (255, 255, 255), 1)
+        cv2.imshow('Video', frame)
+
+        # Hit 'q' on the keyboard to quit!
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    pipeline = RecognitionPipeline(
+        process_frame,
+        source=args.source,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        model=args.model,
+        tracker=face_tracker
+    )
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pipeline.stop()
+    finally:
+        if not args.headless:
+            cv2.destroyAllWindows()
+        if punch_queue:
+            punch_queue.close()
+
+    print(pipeline.report())
+
+
+if __name__ == '__main__':
+    main()
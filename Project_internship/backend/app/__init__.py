@@ -24,6 +24,58 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    # Password hashing: bcrypt cost (log2 rounds) and the worker pool it runs in (0 workers hashes inline)
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    app.config['BCRYPT_WORKERS'] = int(os.getenv('BCRYPT_WORKERS', '2'))
+    app.config['BCRYPT_QUEUE_SIZE'] = int(os.getenv('BCRYPT_QUEUE_SIZE', '64'))
+    app.config['BCRYPT_TIMEOUT'] = float(os.getenv('BCRYPT_TIMEOUT', '10'))  # Seconds
+    # Per-process cache of users for admin checks and /api/auth/me
+    app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', '60'))  # Seconds
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', '1024'))
+    
+    # Face matching: 'exact' brute force or 'ivf' approximate search for large rosters
+    app.config['FACE_MATCHER'] = os.getenv('FACE_MATCHER', 'exact')
+    app.config['FACE_MATCH_TOLERANCE'] = float(os.getenv('FACE_MATCH_TOLERANCE', '0.6'))
+    app.config['FACE_IVF_LISTS'] = int(os.getenv('FACE_IVF_LISTS', '0')) or None  # Defaults to sqrt(gallery size)
+    app.config['FACE_IVF_PROBES'] = int(os.getenv('FACE_IVF_PROBES', '8'))
+    # Memory-mapped gallery files shared by the worker processes (defaults to <instance>/face_gallery)
+    app.config['FACE_GALLERY_DIR'] = os.getenv('FACE_GALLERY_DIR')
+    app.config['FACE_GALLERY_POLL_INTERVAL'] = float(os.getenv('FACE_GALLERY_POLL_INTERVAL', '1.0'))  # Seconds
+    # Binary image uploads are decoded at 1/N resolution for recognition (1, 2, 4 or 8)
+    app.config['FACE_DECODE_REDUCTION'] = int(os.getenv('FACE_DECODE_REDUCTION', '2'))
+    # Seconds a process keeps the class and room rosters its gallery partitions are built from
+    app.config['GALLERY_PARTITION_TTL'] = float(os.getenv('GALLERY_PARTITION_TTL', '300'))
+    # Group photos for class roll calls are decoded at full resolution by default, faces there are small
+    app.config['ROLL_CALL_DECODE_REDUCTION'] = int(os.getenv('ROLL_CALL_DECODE_REDUCTION', '1'))
+    
+    # Seconds a process keeps its timetable cache before re-reading schedules other processes added
+    app.config['TIMETABLE_TTL'] = float(os.getenv('TIMETABLE_TTL', '300'))
+    
+    # Seconds the admin dashboard response is reused before it is rebuilt from the database
+    app.config['DASHBOARD_CACHE_TTL'] = float(os.getenv('DASHBOARD_CACHE_TTL', '5'))
+    
+    # Live attendance feed (GET /api/attendance/stream): events buffered per subscriber before
+    # a slow one is dropped, events kept for resuming, seconds between keep-alive comments
+    app.config['EVENT_BUFFER_SIZE'] = int(os.getenv('EVENT_BUFFER_SIZE', '256'))
+    app.config['EVENT_HISTORY_SIZE'] = int(os.getenv('EVENT_HISTORY_SIZE', '2048'))
+    app.config['EVENT_KEEPALIVE'] = float(os.getenv('EVENT_KEEPALIVE', '15'))
+    
+    # Keyset pagination of the student and attendance listings (?limit=&cursor=)
+    app.config['PAGE_SIZE'] = int(os.getenv('PAGE_SIZE', '100'))
+    app.config['PAGE_SIZE_MAX'] = int(os.getenv('PAGE_SIZE_MAX', '500'))
+    
+    # Largest number of punch events accepted by POST /api/attendance/record/batch
+    app.config['ATTENDANCE_BATCH_LIMIT'] = int(os.getenv('ATTENDANCE_BATCH_LIMIT', '1000'))
+    app.config['ATTENDANCE_BATCH_MAX_BYTES'] = int(os.getenv('ATTENDANCE_BATCH_MAX_BYTES', str(4 * 1024 * 1024)))  # Decompressed
+    
+    # Face recognition worker pool behind /api/attendance/record and /record/async
+    app.config['RECOGNITION_WORKERS'] = int(os.getenv('RECOGNITION_WORKERS', '0')) or None  # Defaults to the CPU count
+    app.config['RECOGNITION_QUEUE_SIZE'] = int(os.getenv('RECOGNITION_QUEUE_SIZE', '64'))
+    app.config['RECOGNITION_TIMEOUT'] = float(os.getenv('RECOGNITION_TIMEOUT', '30'))  # Seconds /record waits for its encoding
+    app.config['RECOGNITION_RESULT_TTL'] = int(os.getenv('RECOGNITION_RESULT_TTL', '300'))  # Seconds job results are kept
+    
+    # Worker processes used by POST /api/students/faces/bulk
+    app.config['ENROLLMENT_WORKERS'] = int(os.getenv('ENROLLMENT_WORKERS', '0')) or None  # Defaults to the CPU count
     
     # Initialize extensions with app
     CORS(app)
@@ -42,4 +94,11 @@ def create_app():
     app.register_blueprint(attendance_bp, url_prefix='/api/attendance')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     
+    # Register CLI commands (flask rebuild-summaries, rebuild-counters, purge-idempotency-keys)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    from app.services.event_bus import attendance_events
+    attendance_events.configure(app.config['EVENT_BUFFER_SIZE'], app.config['EVENT_HISTORY_SIZE'])
+    
     return app 
\ No newline at end of file
@@ -0,0 +1,49 @@
+import click
+from datetime import datetime, date, timedelta
+from flask.cli import with_appcontext
+from app import db
+from app.models.attendance import Attendance
+
+@click.command('rebuild-summaries')
+@click.option('--start-date', help='First day to rebuild (YYYY-MM-DD), defaults to the first attendance record')
+@click.option('--end-date', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+@click.option('--class-id', type=int, help='Only rebuild this class')
+@with_appcontext
+def rebuild_summaries(start_date, end_date, class_id):
+    """Backfill or rebuild the daily class attendance summaries from the raw records."""
+    from app.services.attendance_service import AttendanceService
+    
+    if start_date:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    else:
+        start_date = db.session.query(db.func.min(Attendance.date)).scalar() or date.today()
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else date.today()
+    
+    rows = AttendanceService().rebuild_daily_summaries(start_date, end_date, class_id=class_id)
+    click.echo(f"Rebuilt {rows} daily class summaries from {start_date} to {end_date}")
+
+@click.command('rebuild-counters')
+@with_appcontext
+def rebuild_counters():
+    """Reset the dashboard entity counters to the row counts of their tables."""
+    from app.services.entity_counters import rebuild_counters as rebuild
+    
+    for name, value in rebuild().items():
+        click.echo(f"{name}: {value}")
+
+@click.command('purge-idempotency-keys')
+@click.option('--days', type=int, default=7, help='Keep the keys of the last DAYS days')
+@with_appcontext
+def purge_idempotency_keys(days):
+    """Delete the stored results of attendance batches older than --days."""
+    from app.models.idempotency_key import IdempotencyKey
+    
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Deleted {deleted} idempotency keys older than {days} days")
+
+def register_commands(app):
+    app.cli.add_command(rebuild_summaries)
+    app.cli.add_command(rebuild_counters)
+    app.cli.add_command(purge_idempotency_keys)
\ No newline at end of file
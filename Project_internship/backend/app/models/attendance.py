@@ -0,0 +1,35 @@
+from app import db
+from datetime import datetime
+
+class Attendance(db.Model):
+    __tablename__ = 'attendance'
+    __table_args__ = (
+        # One record per student per day, also serves lookups by student and by (student, date)
+        db.UniqueConstraint('student_id', 'date', name='uq_attendance_student_date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    punch_in_time = db.Column(db.DateTime, nullable=False)
+    punch_out_time = db.Column(db.DateTime)
+    status = db.Column(db.String(20), nullable=False)  # present, late
+    attendance_type = db.Column(db.String(20), nullable=False)  # face, fingerprint, card
+    location = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'date': self.date.isoformat(),
+            'punch_in_time': self.punch_in_time.isoformat(),
+            'punch_out_time': self.punch_out_time.isoformat() if self.punch_out_time else None,
+            'status': self.status,
+            'attendance_type': self.attendance_type,
+            'location': self.location,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
\ No newline at end of file
@@ -0,0 +1,29 @@
+from app import db
+from datetime import datetime
+
+class DailyClassSummary(db.Model):
+    __tablename__ = 'daily_class_summary'
+    __table_args__ = (
+        db.UniqueConstraint('class_id', 'date', name='uq_daily_class_summary_class_date'),
+        db.Index('ix_daily_class_summary_date', 'date'),  # Today's totals on the admin dashboard
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    enrolled = db.Column(db.Integer, nullable=False, default=0)  # Students in the class when the row was built
+    present = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'class_id': self.class_id,
+            'date': self.date.isoformat(),
+            'enrolled': self.enrolled,
+            'present': self.present,
+            'late': self.late,
+            'absent': self.absent,
+            'updated_at': self.updated_at.isoformat()
+        }
\ No newline at end of file
@@ -0,0 +1,16 @@
+from app import db
+from datetime import datetime
+
+class EntityCounter(db.Model):
+    __tablename__ = 'entity_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)  # students, teachers, classes
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'value': self.value,
+            'updated_at': self.updated_at.isoformat()
+        }
\ No newline at end of file
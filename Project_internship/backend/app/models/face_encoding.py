@@ -0,0 +1,17 @@
+from app import db
+from datetime import datetime
+
+class FaceEncoding(db.Model):
+    __tablename__ = 'face_encodings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    encoding = db.Column(db.LargeBinary, nullable=False)  # 128 float32 values
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'created_at': self.created_at.isoformat()
+        }
\ No newline at end of file
@@ -0,0 +1,18 @@
+from app import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """Results of a request made with an Idempotency-Key header, replayed when the key is sent again"""
+    __tablename__ = 'idempotency_keys'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    results = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'key': self.key,
+            'created_at': self.created_at.isoformat()
+        }
\ No newline at end of file
@@ -1 +1,39 @@
- 
\ No newline at end of file
+from app import db
+from datetime import datetime
+
+class Student(db.Model):
+    __tablename__ = 'students'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    roll_number = db.Column(db.String(20), unique=True, nullable=False)
+    first_name = db.Column(db.String(50), nullable=False)
+    last_name = db.Column(db.String(50), nullable=False)
+    date_of_birth = db.Column(db.Date)
+    gender = db.Column(db.String(10))
+    address = db.Column(db.String(200))
+    phone_number = db.Column(db.String(20))
+    emergency_contact = db.Column(db.String(20))
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    attendance_records = db.relationship('Attendance', backref='student', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'roll_number': self.roll_number,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'gender': self.gender,
+            'address': self.address,
+            'phone_number': self.phone_number,
+            'emergency_contact': self.emergency_contact,
+            'class_id': self.class_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
\ No newline at end of file
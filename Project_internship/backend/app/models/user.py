@@ -1,6 +1,6 @@
 from app import db
 from datetime import datetime
-import bcrypt
+from app.services.password_hasher import password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,11 +18,15 @@ class User(db.Model):
     teacher_profile = db.relationship('Teacher', backref='user', uselist=False)
     
     def set_password(self, password):
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        # Hashed in the bcrypt worker pool with BCRYPT_LOG_ROUNDS
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.verify(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """Whether the password hash was made with another cost than BCRYPT_LOG_ROUNDS"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -1,21 +1,36 @@
+from datetime import date
+from functools import wraps
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.models.user import User
+from app.services.password_hasher import HasherBusy
 from app.models.class_model import Class, Schedule
 from app.models.teacher import Teacher
-from app.models.student import Student
 from app.models.attendance import Attendance
+from app.services.user_cache import user_cache
+from app.services.timetable import timetable
+from app.services.attendance_service import AttendanceService
+from app.services.face_recognition_service import face_recognition_service
+from app.services.entity_counters import increment_counter, read_counters
+from app.services.response_cache import ResponseCache
 from app import db
 
 admin_bp = Blueprint('admin', __name__)
+dashboard_cache = ResponseCache('DASHBOARD_CACHE_TTL')
+attendance_service = AttendanceService()
 
 def admin_required(fn):
+    @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # Tokens carry the role, non-admins are turned away without looking the user up
+        role = get_jwt().get('role')
+        if role is not None and role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
         
-        if not user or user.role != 'admin':
+        # Confirm the user still exists and is still an admin (cached, no query on a hit)
+        user = user_cache.get(get_jwt_identity())
+        if not user or user['role'] != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         
         return fn(*args, **kwargs)
@@ -37,7 +52,9 @@ def create_class():
         )
         
         db.session.add(new_class)
+        increment_counter('classes')
         db.session.commit()
+        face_recognition_service.partitions.invalidate()
         
         return jsonify(new_class.to_dict()), 201
     
@@ -60,6 +77,7 @@ def create_schedule(class_id):
         
         db.session.add(new_schedule)
         db.session.commit()
+        timetable.invalidate()
         
         return jsonify(new_schedule.to_dict()), 201
     
@@ -96,10 +114,14 @@ def create_teacher():
         )
         
         db.session.add(teacher)
+        increment_counter('teachers')
         db.session.commit()
         
         return jsonify(teacher.to_dict()), 201
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -108,22 +130,31 @@ def create_teacher():
 @admin_required
 def get_dashboard_data():
     try:
-        # Get total counts
-        total_students = Student.query.count()
-        total_teachers = Teacher.query.count()
-        total_classes = Class.query.count()
-        
-        # Get recent attendance records
-        recent_attendance = Attendance.query.order_by(
-            Attendance.created_at.desc()
-        ).limit(10).all()
-        
-        return jsonify({
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_classes': total_classes,
-            'recent_attendance': [record.to_dict() for record in recent_attendance]
-        }), 200
+        return dashboard_cache.respond(build_dashboard)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def build_dashboard():
+    # Get total counts, maintained by the create endpoints instead of COUNT(*) scans
+    counters = read_counters()
+    
+    # Get recent attendance records (ids follow creation order and are indexed)
+    recent_attendance = Attendance.query.order_by(
+        Attendance.id.desc()
+    ).limit(10).all()
+    
+    # Today's totals from the daily class summaries (one row per class) and the rosters of classes without one
+    present, late, absent = attendance_service.get_day_totals(date.today())
+    
+    return {
+        'total_students': counters['students'],
+        'total_teachers': counters['teachers'],
+        'total_classes': counters['classes'],
+        'today': {
+            'present': present,
+            'late': late,
+            'absent': absent
+        },
+        'recent_attendance': [record.to_dict() for record in recent_attendance]
+    }
\ No newline at end of file
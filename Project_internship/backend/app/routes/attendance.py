@@ -1,29 +1,171 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.attendance_service import AttendanceService
-from app.services.face_recognition_service import FaceRecognitionService
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.services.attendance_service import AttendanceService, EXPORT_COLUMNS
+from app.services.pagination import page_size, paginated
+from app.services.face_recognition_service import face_recognition_service, uploaded_image
+from app.services.recognition_queue import RecognitionQueue, QueueFull, RecognitionTimeout
+from app.services.event_bus import attendance_events, DROPPED
+from app.services.user_cache import user_cache
+from app.routes.admin import admin_required
+from app.models.attendance import Attendance
+from app.models.class_model import Class
+from app.models.student import Student
 from app.models.user import User
 from datetime import datetime
 
 attendance_bp = Blueprint('attendance', __name__)
 attendance_service = AttendanceService()
-face_recognition_service = FaceRecognitionService()
+recognition_queue = RecognitionQueue(face_recognition_service, attendance_service)
+
+EXPORT_CHUNK_SIZE = 1000  # Rows per database fetch and per streamed chunk
+
+def export_value(value):
+    """Dates and times as ISO 8601 strings, everything else as is"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([export_value(value) for value in row])
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, map(export_value, row)))))
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def xlsx_chunks(rows):
+    """Write the rows with openpyxl's write-only mode (rows go to disk, not memory), then stream the file.
+    
+    An xlsx file is a zip whose directory comes last, so nothing can be sent before the
+    last row has been written.
+    """
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Attendance')
+    worksheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        worksheet.append(list(row))
+    
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+    'xlsx': (xlsx_chunks, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+def timed_export(chunks, export_format, started):
+    """Pass the chunks through, logging the time to first byte and the totals"""
+    size = 0
+    for chunk in chunks:
+        if size == 0:
+            current_app.logger.info("Attendance export (%s): first byte after %.1f ms",
+                                    export_format, (time.perf_counter() - started) * 1000)
+        size += len(chunk)
+        yield chunk
+    current_app.logger.info("Attendance export (%s): %d bytes in %.1f ms",
+                            export_format, size, (time.perf_counter() - started) * 1000)
+
+class BodyTooLarge(Exception):
+    pass
+
+def gunzip_body(max_bytes):
+    """Decompressed request body, refusing to inflate more than max_bytes"""
+    with gzip.GzipFile(fileobj=io.BytesIO(request.get_data(cache=False))) as file:
+        body = file.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        raise BodyTooLarge(f'Batch body larger than {max_bytes} bytes')
+    return body
+
+def current_role():
+    """Role of the requesting user, from the token claim or else the user cache"""
+    role = get_jwt().get('role')
+    if role is None:
+        user = user_cache.get(get_jwt_identity())
+        role = user['role'] if user else None
+    return role
+
+def match_scope(data):
+    """The class_id and room a punch was taken in, used to pick a gallery partition"""
+    class_id = data.get('class_id')
+    try:
+        class_id = int(class_id) if class_id else None
+    except (TypeError, ValueError):
+        raise ValueError('class_id must be an integer')
+    return class_id, data.get('room') or None
+
+def queue_full_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+def recognition_timeout_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 @attendance_bp.route('/record', methods=['POST'])
 @jwt_required()
 def record_attendance():
     try:
-        data = request.get_json()
+        # A raw image body or multipart file is decoded as is, other fields come from the query string or form
+        image_upload = uploaded_image(request)
+        data = request.values if image_upload is not None else request.get_json()
         attendance_type = data.get('attendance_type', 'face')  # face, fingerprint, card
         location = data.get('location')
         
         if attendance_type == 'face':
             # Handle face recognition
-            image_data = data.get('image')
+            image_data = image_upload if image_upload is not None else data.get('image')
             if not image_data:
                 return jsonify({'error': 'Image data required for face recognition'}), 400
             
-            student_id = face_recognition_service.recognize_face(image_data)
+            # A kiosk in a known class or room is matched against that partition of the gallery first
+            class_id, room = match_scope(data)
+            
+            # Encode in the recognition worker pool instead of this request thread
+            try:
+                encodings = recognition_queue.encode(
+                    current_app._get_current_object(),
+                    image_data,
+                    timeout=current_app.config['RECOGNITION_TIMEOUT']
+                )
+            except QueueFull as e:
+                return queue_full_response(e)
+            except RecognitionTimeout as e:
+                return recognition_timeout_response(e)
+            
+            student_id = face_recognition_service.match_encodings(encodings, class_id=class_id, room=room)
             if not student_id:
                 return jsonify({'error': 'Face not recognized'}), 400
         
@@ -62,6 +204,266 @@ def record_attendance():
         else:
             return jsonify({'error': message}), 400
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@attendance_bp.route('/record/async', methods=['POST'])
+@jwt_required()
+def submit_recognition_job():
+    try:
+        image_upload = uploaded_image(request)
+        data = request.values if image_upload is not None else request.get_json()
+        image_data = image_upload if image_upload is not None else data.get('image')
+        if not image_data:
+            return jsonify({'error': 'Image data required for face recognition'}), 400
+        
+        class_id, room = match_scope(data)
+        job = recognition_queue.submit(
+            current_app._get_current_object(),
+            image_data,
+            location=data.get('location'),
+            class_id=class_id,
+            room=room
+        )
+        return jsonify({'job_id': job.id, 'status': job.status}), 202
+    
+    except QueueFull as e:
+        return queue_full_response(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@attendance_bp.route('/roll-call/<int:class_id>', methods=['POST'])
+@jwt_required()
+def record_roll_call(class_id):
+    """Mark a whole class present from one group photo.
+    
+    The photo is decoded and run through the face detector once, every face found is
+    matched against the gallery encodings of this class's students only, and the
+    attendance of every recognized student is recorded in one transaction. Students
+    who already have today's attendance are reported as already present instead of
+    being punched out, so the photo can be taken again.
+    """
+    try:
+        if current_role() not in ('admin', 'teacher'):
+            return jsonify({'error': 'Admin or teacher access required'}), 403
+        if Class.query.get(class_id) is None:
+            return jsonify({'error': 'Class not found'}), 404
+        
+        image_upload = uploaded_image(request)
+        data = request.values if image_upload is not None else (request.get_json() or {})
+        image_data = image_upload if image_upload is not None else data.get('image')
+        if not image_data:
+            return jsonify({'error': 'Image data required for face recognition'}), 400
+        
+        started = time.perf_counter()
+        try:
+            encodings = recognition_queue.encode(
+                current_app._get_current_object(),
+                image_data,
+                timeout=current_app.config['RECOGNITION_TIMEOUT'],
+                reduction=current_app.config['ROLL_CALL_DECODE_REDUCTION']
+            )
+        except QueueFull as e:
+            return queue_full_response(e)
+        except RecognitionTimeout as e:
+            return recognition_timeout_response(e)
+        encoded = time.perf_counter()
+        
+        roster = {student_id for student_id, in Student.query.filter_by(class_id=class_id).with_entities(Student.id)}
+        matches, unknown, conflicts = face_recognition_service.match_roll_call(encodings, class_id)
+        matched = time.perf_counter()
+        
+        now = datetime.now()
+        seen = {student_id for _, student_id, _ in matches}
+        present = {student_id for student_id, in Attendance.query.filter(
+            Attendance.date == now.date(),
+            Attendance.student_id.in_(seen)
+        ).with_entities(Attendance.student_id)} if seen else set()
+        
+        # A second punch of the day is a punch out, a roll call only ever punches in
+        to_record = [match for match in matches if match[1] not in present]
+        results = attendance_service.record_attendance_batch([
+            {'student_id': student_id, 'timestamp': now.isoformat(), 'attendance_type': 'face',
+             'location': data.get('location')}
+            for _, student_id, _ in to_record
+        ]) if to_record else []
+        results = dict(zip((student_id for _, student_id, _ in to_record), results))
+        recorded = time.perf_counter()
+        
+        return jsonify({
+            'class_id': class_id,
+            'faces': len(encodings),
+            'recognized': [
+                {'face': face, 'student_id': student_id, 'distance': round(distance, 4),
+                 'success': results[student_id]['success'] if student_id in results else True,
+                 'message': results[student_id]['message'] if student_id in results else 'Already present'}
+                for face, student_id, distance in matches
+            ],
+            'already_present': sorted(present),
+            'unknown_faces': unknown,
+            'conflicts': [
+                {'face': face, 'student_id': student_id, 'distance': round(distance, 4)}
+                for face, student_id, distance in conflicts
+            ],
+            'not_seen': sorted(roster - seen),
+            'encode_ms': round((encoded - started) * 1000, 2),
+            'match_ms': round((matched - encoded) * 1000, 2),
+            'record_ms': round((recorded - matched) * 1000, 2)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@attendance_bp.route('/jobs/metrics', methods=['GET'])
+@admin_required
+def get_recognition_metrics():
+    return jsonify(recognition_queue.metrics()), 200
+
+@attendance_bp.route('/partitions/metrics', methods=['GET'])
+@admin_required
+def get_partition_metrics():
+    """Scoped hit rate, global fallbacks and match latency of every gallery partition used"""
+    return jsonify(face_recognition_service.partitions.metrics()), 200
+
+@attendance_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource cannot set headers: ?jwt=<token>
+def stream_attendance():
+    """Server-Sent Events feed of punches as they are committed, optionally for one class.
+    
+    Browsers reconnect by themselves and send the Last-Event-ID header, the events
+    missed in between are replayed if this process still has them.
+    """
+    if current_role() not in ('admin', 'teacher'):
+        return jsonify({'error': 'Admin or teacher access required'}), 403
+    
+    subscription = attendance_events.subscribe(
+        topic=request.args.get('class_id', type=int),
+        last_event_id=request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    keepalive = current_app.config['EVENT_KEEPALIVE']
+    
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            for event in subscription.events(timeout=keepalive):
+                if event is None:
+                    yield ': keep-alive\n\n'
+                elif event is DROPPED:
+                    # Too slow to keep up, the client reconnects and resumes from its last event ID
+                    yield 'event: dropped\ndata: {}\n\n'
+                else:
+                    event_id, _, data = event
+                    yield f'id: {event_id}\nevent: attendance\ndata: {json.dumps(data)}\n\n'
+        finally:
+            subscription.close()
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Do not let nginx buffer the stream
+    })
+
+@attendance_bp.route('/stream/metrics', methods=['GET'])
+@admin_required
+def get_stream_metrics():
+    return jsonify(attendance_events.metrics()), 200
+
+@attendance_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_recognition_job(job_id):
+    job = recognition_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+@attendance_bp.route('/record/batch', methods=['POST'])
+@jwt_required()
+def record_attendance_batch():
+    try:
+        # Kiosks send gzip bodies and an Idempotency-Key so a batch retried after a lost response is not applied twice
+        if request.content_encoding == 'gzip':
+            data = json.loads(gunzip_body(current_app.config['ATTENDANCE_BATCH_MAX_BYTES']))
+        else:
+            data = request.get_json()
+        events = data.get('events') if isinstance(data, dict) else None
+        
+        if not isinstance(events, list) or not events:
+            return jsonify({'error': 'A non-empty events array is required'}), 400
+        
+        limit = current_app.config['ATTENDANCE_BATCH_LIMIT']
+        if len(events) > limit:
+            return jsonify({'error': f'At most {limit} events per batch'}), 413
+        
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 64:
+            return jsonify({'error': 'Idempotency-Key must be 1 to 64 characters'}), 400
+        
+        started = time.perf_counter()
+        results = None
+        if idempotency_key is not None:
+            results = attendance_service.stored_batch_results(get_jwt_identity(), idempotency_key)
+        replayed = results is not None
+        if not replayed:
+            results = attendance_service.record_attendance_batch(
+                events,
+                user_id=get_jwt_identity(),
+                idempotency_key=idempotency_key
+            )
+        elapsed = time.perf_counter() - started
+        
+        recorded = sum(1 for result in results if result['success'])
+        return jsonify({
+            'results': results,
+            'recorded': recorded,
+            'failed': len(results) - recorded,
+            'replayed': replayed,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'events_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None
+        }), 200
+    
+    except BodyTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@attendance_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_attendance():
+    try:
+        started = time.perf_counter()
+        export_format = request.args.get('format', 'csv')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+        if not start_date or not end_date:
+            return jsonify({'error': 'Start date and end date parameters required'}), 400
+        
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        
+        rows = attendance_service.iter_attendance_export(
+            start_date=start_date,
+            end_date=end_date,
+            class_id=request.args.get('class_id', type=int),
+            student_id=request.args.get('student_id', type=int),
+            chunk_size=EXPORT_CHUNK_SIZE
+        )
+        write_chunks, mimetype = EXPORT_FORMATS[export_format]
+        chunks = timed_export(write_chunks(rows), export_format, started)
+        
+        filename = f"attendance_{start_date}_{end_date}.{export_format}"
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -77,14 +479,21 @@ def get_student_attendance(student_id):
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        attendance_records = attendance_service.get_student_attendance(
+        pages = paginated(request.args)
+        attendance_records, next_cursor = attendance_service.get_student_attendance(
             student_id=student_id,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            limit=page_size(request.args) if pages else None,
+            cursor=request.args.get('cursor')
         )
         
-        return jsonify(attendance_records), 200
+        if not pages:
+            return jsonify(attendance_records), 200  # The unpaginated list older clients expect
+        return jsonify({'items': attendance_records, 'next_cursor': next_cursor}), 200
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -129,4 +538,30 @@ def generate_attendance_report(class_id):
         return jsonify(report), 200
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@attendance_bp.route('/summary/<int:class_id>', methods=['GET'])
+@jwt_required()
+def get_class_summary(class_id):
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        if not start_date or not end_date:
+            return jsonify({'error': 'Start date and end date parameters required'}), 400
+        
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        
+        summary = attendance_service.get_class_summary(
+            class_id=class_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        if summary is None:
+            return jsonify({'error': 'Could not load the attendance summary'}), 500
+        
+        return jsonify(summary), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models.user import User
+from app.services.user_cache import user_cache
+from app.services.password_hasher import HasherBusy
 from app import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -30,6 +32,9 @@ def register():
         
         return jsonify({'message': 'User registered successfully'}), 201
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -43,12 +48,20 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
-        access_token = create_access_token(identity=user.id)
+        # Upgrade the hash to the current cost while the plain password is at hand
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+        
+        access_token = create_access_token(identity=user.id, additional_claims={'role': user.role})
         return jsonify({
             'access_token': access_token,
             'user': user.to_dict()
         }), 200
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -56,13 +69,12 @@ def login():
 @jwt_required()
 def get_current_user():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = user_cache.get(get_jwt_identity())
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify(user.to_dict()), 200
+        return jsonify(user), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -1,12 +1,27 @@
-from flask import Blueprint, request, jsonify
+import json
+import os
+import zipfile
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.student import Student
 from app.models.user import User
-from app.services.face_recognition_service import FaceRecognitionService
+from app.services.password_hasher import HasherBusy
+from app.services.face_recognition_service import face_recognition_service, uploaded_image
+from app.services.pagination import decode_cursor, keyset_page, page_size, paginated
+from app.services.entity_counters import increment_counter
 from app import db
 
 students_bp = Blueprint('students', __name__)
-face_recognition_service = FaceRecognitionService()
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def student_id_from_name(name):
+    """Student ID of an enrollment image named <id>.jpg, <id>_<n>.jpg or <id>/<anything>.jpg"""
+    parts = name.replace('\\', '/').split('/')
+    if len(parts) > 1 and parts[-2].isdigit():
+        return int(parts[-2])
+    stem = os.path.splitext(parts[-1])[0].split('_')[0]
+    return int(stem) if stem.isdigit() else None
 
 @students_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -39,10 +54,15 @@ def create_student():
         )
         
         db.session.add(student)
+        increment_counter('students')
         db.session.commit()
+        face_recognition_service.partitions.invalidate()
         
         return jsonify(student.to_dict()), 201
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -76,6 +96,8 @@ def update_student(student_id):
                 setattr(student, key, value)
         
         db.session.commit()
+        if 'class_id' in data:
+            face_recognition_service.partitions.invalidate()
         return jsonify(student.to_dict()), 200
     
     except Exception as e:
@@ -90,8 +112,11 @@ def register_face(student_id):
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
-        data = request.get_json()
-        image_data = data.get('image')
+        # Raw image body, multipart "image" file or base64 "image" in a JSON body
+        image_data = uploaded_image(request)
+        if image_data is None:
+            data = request.get_json()
+            image_data = data.get('image')
         
         if not image_data:
             return jsonify({'error': 'Image data required'}), 400
@@ -106,12 +131,78 @@ def register_face(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@students_bp.route('/faces/bulk', methods=['POST'])
+@jwt_required()
+def register_faces_bulk():
+    """Enroll many faces from a zip ("archive" field) or several files ("images" fields).
+    
+    Each image is named after its student (see student_id_from_name). Progress is
+    streamed back as one JSON object per line, followed by a summary line.
+    """
+    try:
+        archive = request.files.get('archive')
+        if archive:
+            zip_file = zipfile.ZipFile(archive.stream)
+            entries = [
+                (info.filename, lambda info=info: zip_file.read(info))
+                for info in zip_file.infolist()
+                if not info.is_dir()
+                and not info.filename.startswith('__MACOSX/')
+                and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+        else:
+            entries = [(file.filename, file.read) for file in request.files.getlist('images')]
+        
+        if not entries:
+            return jsonify({'error': 'Upload a zip archive or image files'}), 400
+        
+        # Check every student ID with one query before reading any image
+        names = [(name, student_id_from_name(name), read) for name, read in entries]
+        candidate_ids = {student_id for _, student_id, _ in names if student_id is not None}
+        existing_ids = {row[0] for row in db.session.query(Student.id).filter(Student.id.in_(candidate_ids))}
+        
+        def items():
+            for name, student_id, read in names:
+                if student_id in existing_ids:
+                    yield name, student_id, read()
+                else:
+                    yield name, student_id, None  # Not read: no student ID in the name, or no such student
+        
+        progress = face_recognition_service.register_faces(
+            items(),
+            workers=current_app.config['ENROLLMENT_WORKERS']
+        )
+        lines = (json.dumps(update) + '\n' for update in progress)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Archive is not a valid zip file'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @students_bp.route('/class/<int:class_id>', methods=['GET'])
 @jwt_required()
 def get_class_students(class_id):
     try:
-        students = Student.query.filter_by(class_id=class_id).all()
-        return jsonify([student.to_dict() for student in students]), 200
+        query = Student.query.filter_by(class_id=class_id)
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_id = decode_cursor(cursor)
+            if not isinstance(cursor_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.filter(Student.id > cursor_id)
+        
+        pages = paginated(request.args)
+        students, next_cursor = keyset_page(
+            query.order_by(Student.id), page_size(request.args) if pages else None, lambda student: student.id)
+        if not pages:
+            return jsonify([student.to_dict() for student in students]), 200  # The unpaginated list older clients expect
+        return jsonify({
+            'items': [student.to_dict() for student in students],
+            'next_cursor': next_cursor
+        }), 200
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
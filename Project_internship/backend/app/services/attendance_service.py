@@ -1,9 +1,35 @@
-from datetime import datetime, time
+import json
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
 from app.models.attendance import Attendance
+from app.models.daily_class_summary import DailyClassSummary
+from app.models.idempotency_key import IdempotencyKey
 from app.models.student import Student
-from app.models.class import Class, Schedule
+from app.models.class_model import Class, Schedule
+from app.services.pagination import decode_cursor, keyset_page
+from app.services.event_bus import attendance_events
+from app.services.timetable import timetable
 from app import db
 
+# Columns of the attendance export, in order
+EXPORT_COLUMNS = [
+    'id', 'student_id', 'roll_number', 'student_name', 'date',
+    'punch_in_time', 'punch_out_time', 'status', 'attendance_type', 'location'
+]
+
+def punch_event(kind, class_id, student_id, punch_time, status=None, attendance_type=None):
+    """Live feed event of a committed punch, kind is punch_in or punch_out"""
+    return class_id, {
+        'type': kind,
+        'class_id': class_id,
+        'student_id': student_id,
+        'date': punch_time.date().isoformat(),
+        'time': punch_time.isoformat(),
+        'status': status,
+        'attendance_type': attendance_type
+    }
+
 class AttendanceService:
     def record_attendance(self, student_id, attendance_type, location=None):
         """Record attendance for a student"""
@@ -11,17 +37,14 @@ class AttendanceService:
             today = datetime.now().date()
             current_time = datetime.now()
             
-            # Get student's class schedule
+            # Get student's class
             student = Student.query.get(student_id)
             if not student or not student.class_id:
                 return False, "Student not found or not assigned to a class"
             
-            class_schedule = Schedule.query.filter_by(
-                class_id=student.class_id,
-                day_of_week=current_time.weekday()
-            ).first()
-            
-            if not class_schedule:
+            # Status against the period the punch falls in (or the next one), from the cached timetable
+            status = timetable.status(student.class_id, current_time)
+            if status is None:
                 return False, "No schedule found for today"
             
             # Check if attendance already exists for today
@@ -35,13 +58,10 @@ class AttendanceService:
                 if not existing_attendance.punch_out_time:
                     existing_attendance.punch_out_time = current_time
                     db.session.commit()
+                    attendance_events.publish(*punch_event('punch_out', student.class_id, student_id, current_time))
                     return True, "Punch out recorded successfully"
                 return False, "Attendance already recorded for today"
             
-            # Determine status based on class schedule
-            class_start_time = datetime.combine(today, class_schedule.start_time)
-            status = "late" if current_time > class_start_time else "present"
-            
             # Create new attendance record
             new_attendance = Attendance(
                 student_id=student_id,
@@ -53,28 +73,372 @@ class AttendanceService:
             )
             
             db.session.add(new_attendance)
+            self._count_in_summary(
+                student.class_id,
+                today,
+                present=1 if status == "present" else 0,
+                late=1 if status == "late" else 0
+            )
             db.session.commit()
+            attendance_events.publish(*punch_event(
+                'punch_in', student.class_id, student_id, current_time, status, attendance_type))
             return True, "Attendance recorded successfully"
         
+        except IntegrityError:
+            # A concurrent punch inserted today's record first (uq_attendance_student_date)
+            db.session.rollback()
+            return False, "Attendance already recorded for today"
         except Exception as e:
             db.session.rollback()
             return False, f"Error recording attendance: {str(e)}"
     
-    def get_student_attendance(self, student_id, start_date=None, end_date=None):
-        """Get attendance records for a student"""
+    def _count_in_summary(self, class_id, day, present=0, late=0):
+        """Move students of the class from absent to present/late in the day's summary row.
+        
+        Runs in the caller's transaction. The counters are incremented by the database
+        (column = column + n) so concurrent punches never overwrite each other.
+        """
+        values = {
+            DailyClassSummary.present: DailyClassSummary.present + present,
+            DailyClassSummary.late: DailyClassSummary.late + late,
+            DailyClassSummary.absent: DailyClassSummary.absent - (present + late),
+            DailyClassSummary.updated_at: datetime.utcnow()
+        }
+        summary = DailyClassSummary.query.filter_by(class_id=class_id, date=day)
+        
+        if summary.update(values, synchronize_session=False):
+            return
+        
+        # First punch of the day for this class
+        enrolled = Student.query.filter_by(class_id=class_id).count()
+        try:
+            with db.session.begin_nested():
+                db.session.add(DailyClassSummary(
+                    class_id=class_id,
+                    date=day,
+                    enrolled=enrolled,
+                    present=present,
+                    late=late,
+                    absent=enrolled - (present + late)
+                ))
+        except IntegrityError:
+            # Another punch created the row first
+            summary.update(values, synchronize_session=False)
+    
+    def stored_batch_results(self, user_id, idempotency_key):
+        """Results of the batch a user already sent with this Idempotency-Key, or None"""
+        stored = IdempotencyKey.query.get((user_id, idempotency_key))
+        return json.loads(stored.results) if stored else None
+    
+    def record_attendance_batch(self, events, retry=True, user_id=None, idempotency_key=None):
+        """Record a batch of punch events in one transaction.
+        
+        Each event is a dict with student_id, timestamp (ISO 8601, the time of the punch
+        on the device), attendance_type and an optional location. Events are applied in
+        order with the same rules as record_attendance: the first punch of a day is the
+        punch in, the next one the punch out. Students and existing records are loaded
+        with one query each, schedules come from the cached timetable, new records are
+        bulk inserted and the batch is committed once. Returns one {'index', 'student_id',
+        'success', 'message'} per event. If a concurrent punch inserts one of the records
+        first, the batch is applied again once on top of it.
+        
+        With an idempotency_key the results are stored in the same transaction as the
+        records, so a batch sent again under the same key (by user_id) is never applied
+        twice: its stored results are returned instead.
+        """
+        results = [None] * len(events)
+        punches = []
+        
+        for index, event in enumerate(events):
+            student_id = event.get('student_id') if isinstance(event, dict) else None
+            try:
+                punch_time = datetime.fromisoformat(event['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                punch_time = None
+            
+            if not isinstance(student_id, int):
+                results[index] = (student_id, False, "student_id is required")
+            elif punch_time is None:
+                results[index] = (student_id, False, "timestamp must be an ISO 8601 date and time")
+            else:
+                # Compare naive local times like record_attendance does
+                if punch_time.tzinfo is not None:
+                    punch_time = punch_time.astimezone().replace(tzinfo=None)
+                punches.append((index, student_id, punch_time, event))
+        
+        student_ids = {student_id for _, student_id, _, _ in punches}
+        dates = {punch_time.date() for _, _, punch_time, _ in punches}
+        
         try:
-            query = Attendance.query.filter_by(student_id=student_id)
+            student_classes = dict(db.session.query(
+                Student.id,
+                Student.class_id
+            ).filter(Student.id.in_(student_ids)))
             
-            if start_date:
-                query = query.filter(Attendance.date >= start_date)
-            if end_date:
-                query = query.filter(Attendance.date <= end_date)
+            # Existing records of these students on these days: (student, date) -> (id, punch out time)
+            existing = {
+                (student_id, day): (attendance_id, punch_out_time)
+                for attendance_id, student_id, day, punch_out_time in db.session.query(
+                    Attendance.id,
+                    Attendance.student_id,
+                    Attendance.date,
+                    Attendance.punch_out_time
+                ).filter(
+                    Attendance.student_id.in_(student_ids),
+                    Attendance.date.in_(dates)
+                )
+            }
             
-            attendance_records = query.order_by(Attendance.date.desc()).all()
-            return [record.to_dict() for record in attendance_records]
+            now = datetime.utcnow()
+            new_records = {}
+            punch_outs = {}
+            summary_counts = {}
+            feed = []  # Live feed events, published once the batch is committed
+            
+            for index, student_id, punch_time, event in punches:
+                class_id = student_classes.get(student_id)
+                day = punch_time.date()
+                key = (student_id, day)
+                
+                if not class_id:
+                    results[index] = (student_id, False, "Student not found or not assigned to a class")
+                    continue
+                
+                status = timetable.status(class_id, punch_time)
+                if status is None:
+                    results[index] = (student_id, False, "No schedule found for this day")
+                    continue
+                
+                if key in new_records or key in existing:
+                    if key in new_records:
+                        punched_out = new_records[key]['punch_out_time'] is not None
+                    else:
+                        punched_out = existing[key][1] is not None or key in punch_outs
+                    
+                    if punched_out:
+                        results[index] = (student_id, False, "Attendance already recorded for today")
+                    elif key in new_records:
+                        new_records[key]['punch_out_time'] = punch_time
+                        results[index] = (student_id, True, "Punch out recorded successfully")
+                        feed.append(punch_event('punch_out', class_id, student_id, punch_time))
+                    else:
+                        punch_outs[key] = {'id': existing[key][0], 'punch_out_time': punch_time, 'updated_at': now}
+                        results[index] = (student_id, True, "Punch out recorded successfully")
+                        feed.append(punch_event('punch_out', class_id, student_id, punch_time))
+                    continue
+                
+                new_records[key] = {
+                    'student_id': student_id,
+                    'date': day,
+                    'punch_in_time': punch_time,
+                    'punch_out_time': None,
+                    'status': status,
+                    'attendance_type': event.get('attendance_type', 'face'),
+                    'location': event.get('location'),
+                    'created_at': now,
+                    'updated_at': now
+                }
+                counts = summary_counts.setdefault((class_id, day), {'present': 0, 'late': 0})
+                counts[status] += 1
+                results[index] = (student_id, True, "Attendance recorded successfully")
+                feed.append(punch_event(
+                    'punch_in', class_id, student_id, punch_time, status, new_records[key]['attendance_type']))
+            
+            batch_results = [
+                {'index': index, 'student_id': student_id, 'success': success, 'message': message}
+                for index, (student_id, success, message) in enumerate(results)
+            ]
+            
+            if new_records:
+                db.session.execute(Attendance.__table__.insert(), list(new_records.values()))
+            if punch_outs:
+                db.session.bulk_update_mappings(Attendance, list(punch_outs.values()))
+            for (class_id, day), counts in summary_counts.items():
+                self._count_in_summary(class_id, day, **counts)
+            if idempotency_key is not None:
+                db.session.add(IdempotencyKey(
+                    user_id=user_id,
+                    key=idempotency_key,
+                    results=json.dumps(batch_results)
+                ))
+            db.session.commit()
+            for topic, data in feed:
+                attendance_events.publish(topic, data)
         
         except Exception as e:
-            return []
+            db.session.rollback()
+            if retry and isinstance(e, IntegrityError):
+                # A concurrent punch inserted one of these records first (uq_attendance_student_date),
+                # or a concurrent request with the same idempotency key committed first
+                if idempotency_key is not None:
+                    stored = self.stored_batch_results(user_id, idempotency_key)
+                    if stored is not None:
+                        return stored
+                return self.record_attendance_batch(
+                    events, retry=False, user_id=user_id, idempotency_key=idempotency_key)
+            # Nothing of the batch was recorded
+            return [
+                {'index': index, 'student_id': event.get('student_id') if isinstance(event, dict) else None,
+                 'success': False, 'message': f"Error recording attendance: {str(e)}"}
+                for index, event in enumerate(events)
+            ]
+        
+        return batch_results
+    
+    def rebuild_daily_summaries(self, start_date, end_date, class_id=None):
+        """Recompute the daily class summaries of a date range from the raw attendance records.
+        
+        A row is written for every day a class is scheduled and for every day it has
+        attendance, so days nobody attended are counted as absent. Returns the number
+        of rows written.
+        """
+        classes = db.session.query(Class.id)
+        if class_id is not None:
+            classes = classes.filter(Class.id == class_id)
+        class_ids = [row[0] for row in classes]
+        
+        enrolled = dict(db.session.query(
+            Student.class_id,
+            func.count(Student.id)
+        ).filter(
+            Student.class_id.in_(class_ids)
+        ).group_by(
+            Student.class_id
+        ))
+        
+        weekdays = {}
+        for schedule_class_id, day_of_week in db.session.query(
+            Schedule.class_id,
+            Schedule.day_of_week
+        ).filter(Schedule.class_id.in_(class_ids)):
+            weekdays.setdefault(schedule_class_id, set()).add(day_of_week)
+        
+        counts = {}
+        for count_class_id, day, status, count in db.session.query(
+            Student.class_id,
+            Attendance.date,
+            Attendance.status,
+            func.count(Attendance.id)
+        ).join(
+            Student, Student.id == Attendance.student_id
+        ).filter(
+            Student.class_id.in_(class_ids),
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        ).group_by(
+            Student.class_id,
+            Attendance.date,
+            Attendance.status
+        ):
+            counts.setdefault((count_class_id, day), {})[status] = count
+        
+        rows = []
+        now = datetime.utcnow()
+        for summary_class_id in class_ids:
+            day = start_date
+            while day <= end_date:
+                day_counts = counts.get((summary_class_id, day))
+                if day_counts is not None or day.weekday() in weekdays.get(summary_class_id, ()):
+                    day_counts = day_counts or {}
+                    class_size = enrolled.get(summary_class_id, 0)
+                    present = day_counts.get("present", 0)
+                    late = day_counts.get("late", 0)
+                    rows.append({
+                        'class_id': summary_class_id,
+                        'date': day,
+                        'enrolled': class_size,
+                        'present': present,
+                        'late': late,
+                        'absent': max(class_size - present - late, 0),
+                        'updated_at': now
+                    })
+                day += timedelta(days=1)
+        
+        try:
+            DailyClassSummary.query.filter(
+                DailyClassSummary.class_id.in_(class_ids),
+                DailyClassSummary.date >= start_date,
+                DailyClassSummary.date <= end_date
+            ).delete(synchronize_session=False)
+            if rows:
+                db.session.execute(DailyClassSummary.__table__.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return len(rows)
+    
+    def get_student_attendance(self, student_id, start_date=None, end_date=None, limit=100, cursor=None):
+        """Get one page of a student's attendance records, newest first.
+        
+        Pages are keyed on (date, id) rather than an offset, so every page costs the
+        same. Returns (records, next_cursor); cursor is the next_cursor of the previous
+        page, limit None returns all the records. Raises ValueError for a malformed cursor.
+        """
+        query = Attendance.query.filter_by(student_id=student_id)
+        
+        if start_date:
+            query = query.filter(Attendance.date >= start_date)
+        if end_date:
+            query = query.filter(Attendance.date <= end_date)
+        if cursor:
+            try:
+                cursor_date, cursor_id = decode_cursor(cursor)
+                cursor_date = datetime.strptime(cursor_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+            if not isinstance(cursor_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.filter(or_(
+                Attendance.date < cursor_date,
+                and_(Attendance.date == cursor_date, Attendance.id < cursor_id)
+            ))
+        
+        query = query.order_by(Attendance.date.desc(), Attendance.id.desc())
+        attendance_records, next_cursor = keyset_page(
+            query, limit, lambda record: [record.date.isoformat(), record.id])
+        return [record.to_dict() for record in attendance_records], next_cursor
+    
+    def iter_attendance_export(self, start_date, end_date, class_id=None, student_id=None, chunk_size=1000):
+        """Yield the attendance records of a date range as tuples in EXPORT_COLUMNS order.
+        
+        Rows are read from a server-side cursor chunk_size at a time and are never
+        turned into ORM objects, so memory stays bounded whatever the size of the range.
+        """
+        query = db.session.query(
+            Attendance.id,
+            Attendance.student_id,
+            Student.roll_number,
+            Student.first_name,
+            Student.last_name,
+            Attendance.date,
+            Attendance.punch_in_time,
+            Attendance.punch_out_time,
+            Attendance.status,
+            Attendance.attendance_type,
+            Attendance.location
+        ).join(
+            Student, Student.id == Attendance.student_id
+        ).filter(
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        )
+        
+        if class_id is not None:
+            query = query.filter(Student.class_id == class_id)
+        if student_id is not None:
+            query = query.filter(Attendance.student_id == student_id)
+        
+        query = query.order_by(
+            Attendance.date,
+            Attendance.id
+        ).execution_options(stream_results=True).yield_per(chunk_size)
+        
+        for (attendance_id, row_student_id, roll_number, first_name, last_name, date,
+             punch_in_time, punch_out_time, status, attendance_type, location) in query:
+            yield (attendance_id, row_student_id, roll_number, f"{first_name} {last_name}", date,
+                   punch_in_time, punch_out_time, status, attendance_type, location)
     
     def get_class_attendance(self, class_id, date):
         """Get attendance records for a class on a specific date"""
@@ -95,25 +459,49 @@ class AttendanceService:
     def generate_attendance_report(self, class_id, start_date, end_date):
         """Generate attendance report for a class"""
         try:
-            students = Student.query.filter_by(class_id=class_id).all()
-            report = []
+            total_days = (end_date - start_date).days + 1
             
-            for student in students:
-                attendance_records = Attendance.query.filter(
-                    Attendance.student_id == student.id,
+            # Count each student's records per status in a single grouped query; the outer join
+            # keeps students without any attendance in the range. Rows are plain tuples, no ORM objects.
+            rows = db.session.query(
+                Student.id,
+                Student.first_name,
+                Student.last_name,
+                Student.roll_number,
+                Attendance.status,
+                func.count(Attendance.id)
+            ).outerjoin(
+                Attendance,
+                and_(
+                    Attendance.student_id == Student.id,
                     Attendance.date >= start_date,
                     Attendance.date <= end_date
-                ).all()
-                
-                total_days = (end_date - start_date).days + 1
-                present_days = sum(1 for record in attendance_records if record.status == "present")
-                late_days = sum(1 for record in attendance_records if record.status == "late")
+                )
+            ).filter(
+                Student.class_id == class_id
+            ).group_by(
+                Student.id,
+                Attendance.status
+            ).order_by(
+                Student.id
+            ).all()
+            
+            status_counts = {}
+            students = {}
+            for student_id, first_name, last_name, roll_number, status, count in rows:
+                students[student_id] = (first_name, last_name, roll_number)
+                status_counts.setdefault(student_id, {})[status] = count
+            
+            report = []
+            for student_id, (first_name, last_name, roll_number) in students.items():
+                present_days = status_counts[student_id].get("present", 0)
+                late_days = status_counts[student_id].get("late", 0)
                 absent_days = total_days - present_days - late_days
                 
                 report.append({
-                    'student_id': student.id,
-                    'student_name': f"{student.first_name} {student.last_name}",
-                    'roll_number': student.roll_number,
+                    'student_id': student_id,
+                    'student_name': f"{first_name} {last_name}",
+                    'roll_number': roll_number,
                     'total_days': total_days,
                     'present_days': present_days,
                     'late_days': late_days,
@@ -124,4 +512,77 @@ class AttendanceService:
             return report
         
         except Exception as e:
-            return [] 
\ No newline at end of file
+            return []
+    
+    def get_day_totals(self, day):
+        """Present, late and absent students of every class on a day.
+        
+        Classes scheduled that day without a summary row (nobody punched in yet) count
+        their whole roster as absent.
+        """
+        present, late, absent = db.session.query(
+            func.coalesce(func.sum(DailyClassSummary.present), 0),
+            func.coalesce(func.sum(DailyClassSummary.late), 0),
+            func.coalesce(func.sum(DailyClassSummary.absent), 0)
+        ).filter(DailyClassSummary.date == day).one()
+        
+        unsummarized = db.session.query(func.count(Student.id)).filter(
+            Student.class_id.in_(
+                db.session.query(Schedule.class_id).filter(Schedule.day_of_week == day.weekday())
+            ),
+            Student.class_id.notin_(
+                db.session.query(DailyClassSummary.class_id).filter(DailyClassSummary.date == day)
+            )
+        ).scalar()
+        return present, late, absent + unsummarized
+    
+    def get_class_summary(self, class_id, start_date, end_date):
+        """Daily present/late/absent counts of a class, read from the summary table (one row per day).
+        
+        Scheduled days up to today that have no summary row (nobody punched in and the
+        summaries were not rebuilt) count the whole class roster as absent.
+        """
+        try:
+            days = {day.date: day.to_dict() for day in DailyClassSummary.query.filter(
+                DailyClassSummary.class_id == class_id,
+                DailyClassSummary.date >= start_date,
+                DailyClassSummary.date <= end_date
+            )}
+            
+            class_size = Student.query.filter_by(class_id=class_id).count()
+            weekdays = {day_of_week for day_of_week, in db.session.query(
+                Schedule.day_of_week
+            ).filter(Schedule.class_id == class_id)}
+            day = start_date
+            while day <= min(end_date, date.today()):
+                if day not in days and day.weekday() in weekdays:
+                    days[day] = {
+                        'class_id': class_id,
+                        'date': day.isoformat(),
+                        'enrolled': class_size,
+                        'present': 0,
+                        'late': 0,
+                        'absent': class_size,
+                        'updated_at': None
+                    }
+                day += timedelta(days=1)
+            days = [days[day] for day in sorted(days)]
+            
+            present = sum(day['present'] for day in days)
+            late = sum(day['late'] for day in days)
+            absent = sum(day['absent'] for day in days)
+            total = present + late + absent
+            
+            return {
+                'class_id': class_id,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'days': days,
+                'present': present,
+                'late': late,
+                'absent': absent,
+                'attendance_percentage': (present / total * 100) if total > 0 else 0
+            }
+        
+        except Exception as e:
+            return None 
\ No newline at end of file
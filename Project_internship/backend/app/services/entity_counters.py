@@ -0,0 +1,57 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app.models.class_model import Class
+from app.models.entity_counter import EntityCounter
+from app.models.student import Student
+from app.models.teacher import Teacher
+from app import db
+
+# Counter name -> model whose rows it counts
+COUNTED_MODELS = {
+    'students': Student,
+    'teachers': Teacher,
+    'classes': Class
+}
+
+def increment_counter(name, by=1):
+    """Count new rows in the caller's transaction, before it commits.
+    
+    The database does the increment (value = value + n), so concurrent creates never
+    overwrite each other. A counter that does not exist yet is seeded with COUNT(*),
+    which already includes the caller's new (flushed) row.
+    """
+    counter = EntityCounter.query.filter_by(name=name)
+    values = {EntityCounter.value: EntityCounter.value + by, EntityCounter.updated_at: datetime.utcnow()}
+    if counter.update(values, synchronize_session=False):
+        return
+    
+    value = COUNTED_MODELS[name].query.count()
+    try:
+        with db.session.begin_nested():
+            db.session.add(EntityCounter(name=name, value=value))
+    except IntegrityError:
+        # Another create seeded the counter first, without our uncommitted row
+        counter.update(values, synchronize_session=False)
+
+def read_counters():
+    """Every counter as {name: value}, counting the table for any counter not seeded yet"""
+    counters = dict(db.session.query(EntityCounter.name, EntityCounter.value))
+    for name, model in COUNTED_MODELS.items():
+        if name not in counters:
+            counters[name] = model.query.count()
+    return counters
+
+def rebuild_counters():
+    """Reset every counter to COUNT(*) of its table, return {name: value}"""
+    counters = {name: model.query.count() for name, model in COUNTED_MODELS.items()}
+    try:
+        EntityCounter.query.filter(EntityCounter.name.in_(counters)).delete(synchronize_session=False)
+        db.session.execute(EntityCounter.__table__.insert(), [
+            {'name': name, 'value': value, 'updated_at': datetime.utcnow()}
+            for name, value in counters.items()
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counters
\ No newline at end of file
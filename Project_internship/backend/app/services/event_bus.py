@@ -0,0 +1,122 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+DROPPED = object()  # Yielded once by Subscription.events() when the subscriber fell too far behind
+
+class Subscription:
+    """One listener of the bus: a bounded buffer of (event ID, topic, data) tuples"""
+    
+    def __init__(self, bus, topic, buffer_size):
+        self.bus = bus
+        self.topic = topic
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.dropped = False
+    
+    def matches(self, topic):
+        return self.topic is None or self.topic == topic
+    
+    def events(self, timeout):
+        """Yield events as they are published, None every timeout seconds without one.
+        
+        Ends after yielding DROPPED once the subscriber was dropped and its buffer is empty.
+        """
+        while True:
+            try:
+                yield self.queue.get(timeout=timeout)
+            except queue.Empty:
+                if self.dropped:
+                    yield DROPPED
+                    return
+                yield None
+    
+    def close(self):
+        self.bus.unsubscribe(self)
+
+class EventBus:
+    """In-process publish/subscribe with per-topic filtering and replay of recent events.
+    
+    publish() never blocks: a subscriber whose buffer is full is dropped (its stream
+    ends and the client reconnects with the last event ID it saw). The last
+    history_size events are kept so a reconnecting subscriber can resume. Event IDs are
+    "<start time>-<sequence>", IDs from before a restart cannot be resumed.
+    Only events published in this process are seen.
+    """
+    
+    def __init__(self, buffer_size=100, history_size=1000):
+        self.buffer_size = buffer_size
+        self.epoch = str(int(time.time() * 1000))
+        self.sequence = itertools.count(1)
+        self.history = deque(maxlen=history_size)  # (sequence, event ID, topic, data)
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.published = 0
+        self.drops = 0
+    
+    def configure(self, buffer_size, history_size):
+        with self.lock:
+            self.buffer_size = buffer_size
+            if history_size != self.history.maxlen:
+                self.history = deque(self.history, maxlen=history_size)
+    
+    def _sequence(self, event_id):
+        """Sequence number of an event ID from this process, or None"""
+        epoch, _, sequence = (event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+    
+    def publish(self, topic, data):
+        """Deliver data to the subscribers of topic (and of every topic), return the event ID"""
+        with self.lock:
+            sequence = next(self.sequence)
+            event_id = f"{self.epoch}-{sequence}"
+            self.history.append((sequence, event_id, topic, data))
+            self.published += 1
+            
+            for subscription in list(self.subscribers):
+                if not subscription.matches(topic):
+                    continue
+                try:
+                    subscription.queue.put_nowait((event_id, topic, data))
+                except queue.Full:
+                    # Slow consumer: drop it rather than block the publisher or buffer without bound
+                    subscription.dropped = True
+                    self.subscribers.discard(subscription)
+                    self.drops += 1
+        return event_id
+    
+    def subscribe(self, topic=None, last_event_id=None):
+        """Subscribe to topic (None for every topic), replaying the kept events after last_event_id"""
+        with self.lock:
+            subscription = Subscription(self, topic, self.buffer_size)
+            last_sequence = self._sequence(last_event_id)
+            if last_sequence is not None:
+                missed = [
+                    (event_id, event_topic, data)
+                    for sequence, event_id, event_topic, data in self.history
+                    if sequence > last_sequence and subscription.matches(event_topic)
+                ]
+                # Only the newest events fit in the buffer, the rest cannot be resumed anyway
+                for event in missed[-self.buffer_size:]:
+                    subscription.queue.put_nowait(event)
+            self.subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+    
+    def metrics(self):
+        with self.lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'published': self.published,
+                'dropped_subscribers': self.drops,
+                'history': len(self.history)
+            }
+
+# Attendance punches, topic = class ID
+attendance_events = EventBus()
\ No newline at end of file
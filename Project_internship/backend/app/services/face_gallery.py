@@ -0,0 +1,192 @@
+import itertools
+import os
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from app.models.face_encoding import FaceEncoding
+from app.services.face_matcher import ENCODING_SIZE
+from app import db
+
+try:
+    import fcntl
+except ImportError:  # Windows, a single process owns the gallery files
+    fcntl = None
+
+ENCODINGS_FILE = 'encodings.f32'  # float32 rows of ENCODING_SIZE values
+ROWS_FILE = 'rows.i64'  # int64 (face encoding id, student id) of every encoding row
+ENCODING_BYTES = ENCODING_SIZE * 4
+ROW_BYTES = 2 * 8
+
+# An immutable view of the gallery: searches keep using the snapshot they started with
+GallerySnapshot = namedtuple('GallerySnapshot', ['version', 'encoding_ids', 'student_ids', 'encodings', 'matcher', 'inode'])
+
+def _map(path, dtype, columns, count):
+    """Map the first count rows of an append-only file read-only, without reading it"""
+    if count == 0:
+        return np.empty((0, columns), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count, columns))
+
+class SharedGallery:
+    """Process-wide face gallery with copy-on-write snapshots.
+    
+    The encodings live in append-only files next to the database (the database stays
+    the source of truth), which every worker process memory-maps, so gunicorn workers
+    share one copy of the matrix through the page cache. Enrolling a face appends to
+    the files and publishes a new snapshot; the matcher is extended with the new rows
+    instead of being rebuilt. Readers take the current snapshot without any lock, and
+    other workers pick up appended rows the next time they poll the files.
+    """
+    
+    def __init__(self, create_matcher):
+        self.create_matcher = create_matcher
+        self.directory = None
+        self.poll_interval = 1.0
+        self.snapshot = None
+        self.last_poll = 0.0
+        self.versions = itertools.count(1)  # Never reused, also across load(), so caches keyed on it go stale
+        self.write_lock = threading.Lock()  # Serializes loads and enrollments in this process
+    
+    def _configure(self, app):
+        if self.directory is None:
+            self.directory = app.config['FACE_GALLERY_DIR'] or os.path.join(app.instance_path, 'face_gallery')
+            self.poll_interval = app.config['FACE_GALLERY_POLL_INTERVAL']
+            os.makedirs(self.directory, exist_ok=True)
+    
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+    
+    def _lock_files(self, exclusive=True, blocking=True):
+        """Lock the gallery files against the other processes, return the lock file or None if it is busy"""
+        lock_file = open(self._path('gallery.lock'), 'a')
+        if fcntl:
+            flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(lock_file.fileno(), flags)
+            except BlockingIOError:
+                lock_file.close()
+                return None
+        return lock_file
+    
+    def _file_rows(self):
+        """Number of complete rows in both files, and the inode of the rows file"""
+        rows_stat = os.stat(self._path(ROWS_FILE))
+        encodings_size = os.path.getsize(self._path(ENCODINGS_FILE))
+        return min(rows_stat.st_size // ROW_BYTES, encodings_size // ENCODING_BYTES), rows_stat.st_ino
+    
+    def _publish(self, count, inode, previous=None):
+        """Map count rows and publish them as the next snapshot, extending the previous matcher if possible"""
+        rows = _map(self._path(ROWS_FILE), np.int64, 2, count)
+        encodings = _map(self._path(ENCODINGS_FILE), np.float32, ENCODING_SIZE, count)
+        
+        if previous is not None and previous.inode == inode and len(previous.matcher) <= count:
+            matcher = previous.matcher.extend(encodings)
+        else:
+            matcher = self.create_matcher()
+            matcher.build(encodings)
+        
+        self.snapshot = GallerySnapshot(
+            version=next(self.versions),
+            encoding_ids=rows[:, 0],
+            student_ids=rows[:, 1],
+            encodings=encodings,  # In row order, whatever order the matcher keeps its copy in
+            matcher=matcher,
+            inode=inode
+        )
+        return self.snapshot
+    
+    def _write_files(self):
+        """Rewrite both files from the database (called with the file lock held)"""
+        rows = db.session.query(
+            FaceEncoding.id,
+            FaceEncoding.student_id,
+            FaceEncoding.encoding
+        ).order_by(FaceEncoding.id).all()
+        
+        # Write next to the old files and swap them in, processes that mapped the old files keep them
+        with open(self._path(ENCODINGS_FILE + '.tmp'), 'wb') as file:
+            for row in rows:
+                file.write(row.encoding)
+        np.array([(row.id, row.student_id) for row in rows], dtype=np.int64).reshape(-1, 2).tofile(
+            self._path(ROWS_FILE + '.tmp'))
+        os.replace(self._path(ENCODINGS_FILE + '.tmp'), self._path(ENCODINGS_FILE))
+        os.replace(self._path(ROWS_FILE + '.tmp'), self._path(ROWS_FILE))
+    
+    def load(self, app):
+        """Map the gallery files, rewriting them first if they do not match the database"""
+        self._configure(app)
+        with self.write_lock:
+            lock_file = self._lock_files()
+            try:
+                count, last_id = db.session.query(db.func.count(FaceEncoding.id), db.func.max(FaceEncoding.id)).one()
+                
+                up_to_date = False
+                if os.path.exists(self._path(ROWS_FILE)) and os.path.exists(self._path(ENCODINGS_FILE)):
+                    file_count, _ = self._file_rows()
+                    ids = _map(self._path(ROWS_FILE), np.int64, 2, file_count)[:, 0]
+                    up_to_date = file_count == count and (count == 0 or int(ids.max()) == last_id)
+                if not up_to_date:
+                    self._write_files()
+                
+                count, inode = self._file_rows()
+                return self._publish(count, inode)
+            finally:
+                lock_file.close()
+    
+    def current(self, app):
+        """Return the latest snapshot, picking up rows other processes appended since the last poll"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return self.load(app)
+        
+        now = time.monotonic()
+        if now - self.last_poll < self.poll_interval:
+            return snapshot
+        self.last_poll = now
+        
+        # Never wait for a load or an enrollment, the current snapshot is still valid
+        if not self.write_lock.acquire(blocking=False):
+            return snapshot
+        try:
+            lock_file = self._lock_files(exclusive=False, blocking=False)
+            if lock_file is None:
+                return snapshot
+            try:
+                count, inode = self._file_rows()
+                if inode != snapshot.inode or count != len(snapshot.matcher):
+                    return self._publish(count, inode, snapshot)
+                return snapshot
+            finally:
+                lock_file.close()
+        finally:
+            self.write_lock.release()
+    
+    def add(self, app, rows):
+        """Append committed (face encoding id, student id, encoding) rows and publish them.
+        
+        Rows already in the files (appended by another process) are skipped.
+        """
+        snapshot = self.current(app)
+        with self.write_lock:
+            lock_file = self._lock_files()
+            try:
+                count, inode = self._file_rows()
+                known_ids = _map(self._path(ROWS_FILE), np.int64, 2, count)[:, 0]
+                new = ~np.isin(np.array([row[0] for row in rows], dtype=np.int64), known_ids)
+                rows = [row for row, is_new in zip(rows, new) if is_new]
+                
+                if rows:
+                    # Encodings first: readers only use rows present in both files
+                    with open(self._path(ENCODINGS_FILE), 'ab') as file:
+                        file.truncate(count * ENCODING_BYTES)  # Drop a row torn by a crash
+                        for _, _, encoding in rows:
+                            file.write(np.asarray(encoding, dtype=np.float32).tobytes())
+                    with open(self._path(ROWS_FILE), 'ab') as file:
+                        file.truncate(count * ROW_BYTES)
+                        file.write(np.array([row[:2] for row in rows], dtype=np.int64).tobytes())
+                    count += len(rows)
+                
+                previous = self.snapshot if self.snapshot is not None else snapshot
+                return self._publish(count, inode, previous)
+            finally:
+                lock_file.close()
\ No newline at end of file
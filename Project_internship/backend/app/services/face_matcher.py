@@ -0,0 +1,213 @@
+import copy
+import numpy as np
+
+ENCODING_SIZE = 128
+
+def _squared_norms(vectors):
+    return np.einsum('ij,ij->i', vectors, vectors)
+
+def _distances(queries, vectors, vector_norms):
+    """Euclidean distances between every query and every vector, shape (queries, vectors)"""
+    squared = (_squared_norms(queries)[:, None] + vector_norms[None, :]
+               - 2.0 * queries @ vectors.T)
+    np.maximum(squared, 0.0, out=squared)
+    return np.sqrt(squared, out=squared)
+
+def _as_matrix(encodings):
+    return np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+class BruteForceMatcher:
+    """Exact nearest-neighbour search that compares a probe with every encoding"""
+    
+    def __init__(self):
+        self.build(np.empty((0, ENCODING_SIZE), dtype=np.float32))
+    
+    def __len__(self):
+        return len(self.encodings)
+    
+    def build(self, encodings):
+        """Index the gallery encodings, row i of the gallery is returned as index i"""
+        self.encodings = _as_matrix(encodings)
+        self.norms = _squared_norms(self.encodings)
+    
+    def extend(self, encodings):
+        """Return a new matcher over encodings, whose first len(self) rows are already indexed here.
+        
+        This matcher is left untouched, so searches running on it are not affected. The
+        matrix is not copied, it can be a memory-mapped file shared with other processes.
+        """
+        extended = copy.copy(self)
+        extended.encodings = _as_matrix(encodings)
+        extended.norms = np.concatenate([self.norms, _squared_norms(extended.encodings[len(self):])])
+        return extended
+    
+    def search(self, queries):
+        """Return the index and distance of the closest gallery encoding for every query"""
+        queries = _as_matrix(queries)
+        if len(self.encodings) == 0:
+            return np.full(len(queries), -1), np.full(len(queries), np.inf, dtype=np.float32)
+        
+        distances = _distances(queries, self.encodings, self.norms)
+        indices = np.argmin(distances, axis=1)
+        return indices, distances[np.arange(len(queries)), indices]
+    
+    def distances(self, queries):
+        """Return the distance between every query and every gallery encoding, shape (queries, gallery)"""
+        return _distances(_as_matrix(queries), self.encodings, self.norms)
+
+class IVFMatcher:
+    """Approximate nearest-neighbour search with an inverted file over a k-means coarse quantizer.
+    
+    The gallery is split into n_lists clusters and a probe is only compared with the
+    encodings of its n_probe closest clusters. Raising n_probe improves recall at the
+    cost of latency, n_probe == n_lists is an exact search.
+    """
+    
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, train_size=50000, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self.build(np.empty((0, ENCODING_SIZE), dtype=np.float32))
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def _train(self, encodings, n_lists):
+        """Lloyd's k-means on a sample of the encodings"""
+        rng = np.random.default_rng(self.seed)
+        if len(encodings) > self.train_size:
+            encodings = encodings[rng.choice(len(encodings), self.train_size, replace=False)]
+        
+        centroids = encodings[rng.choice(len(encodings), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignments = np.argmin(_distances(encodings, centroids, _squared_norms(centroids)), axis=1)
+            counts = np.bincount(assignments, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, encodings)
+            
+            # Re-seed empty clusters with random encodings so every list stays usable
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                centroids[empty] = encodings[rng.choice(len(encodings), int(empty.sum()))]
+        return centroids
+    
+    def build(self, encodings):
+        """Cluster the gallery encodings and store them grouped by list"""
+        encodings = _as_matrix(encodings)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(encodings))))
+        n_lists = min(n_lists, len(encodings))
+        
+        self.trained_size = len(encodings)
+        if n_lists == 0:
+            self.centroids = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+            self.assignments = np.empty(0, dtype=np.int64)
+            self.order = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.encodings = encodings
+            self.norms = _squared_norms(encodings)
+            return
+        
+        self.centroids = self._train(encodings, n_lists)
+        self.centroid_norms = _squared_norms(self.centroids)
+        self._store_lists(encodings, np.argmin(_distances(encodings, self.centroids, self.centroid_norms), axis=1))
+    
+    def _store_lists(self, encodings, assignments):
+        """Store each list contiguously so probing a list scans one slice of memory"""
+        self.assignments = assignments
+        self.order = np.argsort(assignments, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(self.centroids)))])
+        self.encodings = encodings[self.order]
+        self.norms = _squared_norms(self.encodings)
+    
+    def extend(self, encodings):
+        """Return a new matcher over encodings, whose first len(self) rows are already indexed here.
+        
+        New rows are assigned to the existing lists without retraining. Once the gallery
+        has doubled since the last training the clusters are trained again. This matcher
+        is left untouched, so searches running on it are not affected.
+        """
+        encodings = _as_matrix(encodings)
+        extended = copy.copy(self)
+        if len(self.centroids) == 0 or len(encodings) > 2 * self.trained_size:
+            extended.build(encodings)
+            return extended
+        
+        new_rows = encodings[len(self):]
+        new_assignments = np.argmin(_distances(new_rows, self.centroids, self.centroid_norms), axis=1)
+        extended._store_lists(encodings, np.concatenate([self.assignments, new_assignments]))
+        return extended
+    
+    def search(self, queries):
+        """Return the index and distance of the closest encoding found in the probed lists.
+        
+        Every probed list is one contiguous slice of the list-ordered encodings. The queries
+        are grouped by list, so each list is compared with all the queries that probe it
+        in one product over its slice, without copying any of its rows.
+        """
+        queries = _as_matrix(queries)
+        indices = np.full(len(queries), -1)
+        best = np.full(len(queries), np.inf, dtype=np.float32)
+        if len(self.order) == 0:
+            return indices, best
+        
+        n_probe = min(self.n_probe, len(self.centroids))
+        centroid_distances = _distances(queries, self.centroids, self.centroid_norms)
+        probed_lists = np.argpartition(centroid_distances, n_probe - 1, axis=1)[:, :n_probe].ravel()
+        
+        if len(queries) == 1:
+            return self._search_one(queries[0], probed_lists.tolist())
+        
+        # (list, query) pairs sorted by list, then split into the queries of each list
+        by_list = np.argsort(probed_lists, kind='stable')
+        lists, starts = np.unique(probed_lists[by_list], return_index=True)
+        groups = zip(lists.tolist(), np.split(by_list // n_probe, starts[1:]))
+        
+        # Compare squared distances without the query norm, it is the same for every row of a query
+        best_squared = np.full(len(queries), np.inf, dtype=np.float32)
+        for l, group in groups:
+            start, end = self.offsets[l], self.offsets[l + 1]
+            if start == end:
+                continue
+            squared = self.norms[start:end] - 2.0 * (queries[group] @ self.encodings[start:end].T)
+            nearest = np.argmin(squared, axis=1)
+            nearest_squared = squared[np.arange(len(group)), nearest]
+            
+            closer = nearest_squared < best_squared[group]
+            group = group[closer]
+            best_squared[group] = nearest_squared[closer]
+            indices[group] = self.order[start + nearest[closer]]
+        
+        found = indices >= 0
+        best[found] = np.sqrt(np.maximum(best_squared[found] + _squared_norms(queries[found]), 0.0))
+        return indices, best
+    
+    def _search_one(self, query, lists):
+        """search() of a single query, with plain scalars instead of per-query arrays"""
+        best_index, best_squared = -1, np.inf
+        for l in lists:
+            start, end = self.offsets[l], self.offsets[l + 1]
+            if start == end:
+                continue
+            squared = self.norms[start:end] - 2.0 * (self.encodings[start:end] @ query)
+            nearest = int(squared.argmin())
+            if squared[nearest] < best_squared:
+                best_index, best_squared = start + nearest, squared[nearest]
+        
+        if best_index < 0:
+            return np.full(1, -1), np.full(1, np.inf, dtype=np.float32)
+        distance = np.sqrt(max(best_squared + float(query @ query), 0.0))
+        return np.array([self.order[best_index]]), np.array([distance], dtype=np.float32)
+
+MATCHERS = {
+    'exact': BruteForceMatcher,
+    'ivf': IVFMatcher
+}
+
+def create_matcher(name='exact', **options):
+    """Create the matcher backend registered under name"""
+    if name not in MATCHERS:
+        raise ValueError(f"Unknown face matcher: {name}")
+    return MATCHERS[name](**options)
\ No newline at end of file
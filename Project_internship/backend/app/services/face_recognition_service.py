@@ -1 +1,306 @@
- 
\ No newline at end of file
+import base64
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from datetime import datetime
+import cv2
+import face_recognition
+from flask import current_app
+from app.models.face_encoding import FaceEncoding
+from app.services.face_matcher import create_matcher
+from app.services.face_gallery import SharedGallery
+from app.services.gallery_partitions import GalleryPartitions
+from app import db
+
+def decode_image(image_data):
+    """Decode a base64 (or data URL) image into an RGB array"""
+    if ',' in image_data:
+        image_data = image_data.split(',', 1)[1]  # Strip the "data:image/jpeg;base64," prefix
+    return face_recognition.load_image_file(io.BytesIO(base64.b64decode(image_data)))
+
+def encode_enrollment_image(image_bytes):
+    """Worker process entry point for bulk enrollment: return (single face encoding or None, error, seconds spent)"""
+    started = time.perf_counter()
+    try:
+        encodings = face_recognition.face_encodings(decode_image_bytes(image_bytes))
+    except Exception as e:
+        return None, f"Could not decode image: {e}", time.perf_counter() - started
+    
+    if len(encodings) != 1:
+        return None, f"Expected exactly one face, found {len(encodings)}", time.perf_counter() - started
+    return np.asarray(encodings[0], dtype=np.float32), None, time.perf_counter() - started
+
+# Content types accepted as a raw image request body
+BINARY_IMAGE_TYPES = ('image/jpeg', 'image/png', 'application/octet-stream')
+
+# cv2.imdecode flags that decode straight to 1/2, 1/4 or 1/8 of the full resolution
+DECODE_REDUCTIONS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+def decode_image_bytes(buffer, reduction=1):
+    """Decode an encoded image (bytes, bytearray or memoryview) into an RGB array.
+    
+    The buffer is wrapped without copying and, with reduction > 1, the JPEG decoder
+    only produces the downscaled image, so the full resolution image is never allocated.
+    """
+    image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), DECODE_REDUCTIONS[reduction])
+    if image is None:
+        raise ValueError("Could not decode image")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def uploaded_image(request):
+    """Return the image of a raw image body or an "image" multipart file without copying it, or None"""
+    if request.mimetype in BINARY_IMAGE_TYPES:
+        return request.get_data(cache=False) or None
+    
+    file = request.files.get('image')
+    if not file:
+        return None
+    if isinstance(file.stream, io.BytesIO):
+        return file.stream.getbuffer()  # Small uploads are kept in memory by Werkzeug
+    return file.read()
+
+def encode_image(image_data, reduction=1):
+    """Return the encodings of every face found in a base64 image, or in encoded image bytes"""
+    if isinstance(image_data, str):
+        image = decode_image(image_data)
+    else:
+        image = decode_image_bytes(image_data, reduction)
+    return face_recognition.face_encodings(image)
+
+class FaceRecognitionService:
+    def __init__(self):
+        self.gallery = SharedGallery(self._create_matcher)
+        self.partitions = GalleryPartitions()
+    
+    def _create_matcher(self):
+        """Create the matcher backend selected in the app config"""
+        config = current_app.config
+        if config['FACE_MATCHER'] == 'ivf':
+            return create_matcher(
+                'ivf',
+                n_lists=config['FACE_IVF_LISTS'],
+                n_probe=config['FACE_IVF_PROBES']
+            )
+        return create_matcher(config['FACE_MATCHER'])
+    
+    def load_gallery(self):
+        """Load every registered face encoding into the shared gallery"""
+        return self.gallery.load(current_app._get_current_object())
+    
+    def match_encodings(self, encodings, class_id=None, room=None):
+        """Return the student ID matching the first face encoding, or None if it is not recognized.
+        
+        With a class_id or room the face is first matched against that partition of the
+        gallery only, and against the whole gallery when the partition has no match
+        within the tolerance.
+        """
+        if not len(encodings):
+            return None
+        
+        started = time.perf_counter()
+        # Search the snapshot current at this point, enrollments publish new ones without waiting for us
+        snapshot = self.gallery.current(current_app._get_current_object())
+        tolerance = current_app.config['FACE_MATCH_TOLERANCE']
+        
+        key = ('class', class_id) if class_id else ('room', room) if room else None
+        partition = self.partitions.get(snapshot, key) if key else None
+        if partition is None:
+            student_id = self._search(snapshot.matcher, snapshot.student_ids, encodings, tolerance)
+            self.partitions.record('global', student_id is not None, False, False, time.perf_counter() - started)
+            return student_id
+        
+        student_id = self._search(partition.matcher, partition.student_ids, encodings, tolerance)
+        if student_id is not None:
+            self.partitions.record(key, True, False, False, time.perf_counter() - started)
+            return student_id
+        
+        student_id = self._search(snapshot.matcher, snapshot.student_ids, encodings, tolerance)
+        self.partitions.record(key, False, True, student_id is not None, time.perf_counter() - started)
+        return student_id
+    
+    def _search(self, matcher, student_ids, encodings, tolerance):
+        """Student ID of the closest encoding to the first face if it is within the tolerance, else None"""
+        indices, distances = matcher.search(encodings[:1])
+        if indices[0] < 0 or distances[0] > tolerance:
+            return None
+        return int(student_ids[indices[0]])
+    
+    def match_roll_call(self, encodings, class_id):
+        """Match every face of a group photo against the class's partition of the gallery only.
+        
+        Each face is compared exactly with every gallery row of the class's students, and
+        the (face, student) pairs within the tolerance are assigned closest first, so a
+        student is given to at most one face. Returns (matches, unknown, conflicts):
+        matches are (face index, student ID, distance), unknown the indices of faces
+        with no student within the tolerance, and conflicts (face index, student ID,
+        distance) for faces whose best candidates all went to closer faces.
+        """
+        if not len(encodings):
+            return [], [], []
+        
+        snapshot = self.gallery.current(current_app._get_current_object())
+        partition = self.partitions.get(snapshot, ('class', class_id))
+        if partition is None or not len(partition):
+            return [], list(range(len(encodings))), []
+        row_distances = partition.matcher.distances(encodings)
+        
+        # Best distance of every face to every student, whatever encoding of the student it was
+        candidates, columns = np.unique(partition.student_ids, return_inverse=True)
+        distances = np.full((len(candidates), len(encodings)), np.inf, dtype=np.float32)
+        np.minimum.at(distances, columns, row_distances.T)
+        distances = distances.T
+        
+        tolerance = current_app.config['FACE_MATCH_TOLERANCE']
+        faces, students = np.nonzero(distances <= tolerance)
+        order = np.argsort(distances[faces, students], kind='stable')
+        
+        matches = []
+        claimed = {}  # Face index -> closest student it lost to another face
+        assigned_faces = set()
+        assigned_students = set()
+        for face, student in zip(faces[order].tolist(), students[order].tolist()):
+            if face in assigned_faces:
+                continue
+            if student in assigned_students:
+                claimed.setdefault(face, student)
+                continue
+            assigned_faces.add(face)
+            assigned_students.add(student)
+            matches.append((face, int(candidates[student]), float(distances[face, student])))
+        
+        conflicts = [
+            (face, int(candidates[student]), float(distances[face, student]))
+            for face, student in claimed.items() if face not in assigned_faces
+        ]
+        unknown = [
+            face for face in range(len(encodings))
+            if face not in assigned_faces and face not in claimed
+        ]
+        return sorted(matches), unknown, sorted(conflicts)
+    
+    def register_face(self, student_id, image_data):
+        """Store the encoding of the single face in the image (base64 or bytes) for a student"""
+        try:
+            encodings = encode_image(image_data)
+            if len(encodings) != 1:
+                return False
+            
+            encoding = np.asarray(encodings[0], dtype=np.float32)
+            face_encoding = FaceEncoding(student_id=student_id, encoding=encoding.tobytes())
+            db.session.add(face_encoding)
+            db.session.commit()
+            
+            # Add the new face to the shared gallery without reloading it
+            self.gallery.add(current_app._get_current_object(), [(face_encoding.id, student_id, encoding)])
+            return True
+        
+        except Exception as e:
+            db.session.rollback()
+            return False
+    
+    def register_faces(self, items, workers=None, window=None):
+        """Enroll many (name, student_id, image bytes) items, yielding one progress dict per item and a summary.
+        
+        Images are decoded and encoded across a process pool with at most window images in
+        flight, the encodings are written in one transaction and added to the gallery
+        at once at the end. items may be a generator, so a large archive is never fully read
+        into memory. An item without image bytes is reported as failed: its name had no
+        student ID when student_id is None, else the student does not exist.
+        """
+        started = time.perf_counter()
+        encodings = []
+        failed = 0
+        index = 0
+        
+        workers = workers or os.cpu_count() or 1
+        window = window or workers * 4
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        in_flight = {}
+        items = iter(items)
+        try:
+            exhausted = False
+            while in_flight or not exhausted:
+                # Keep the pool busy without reading every image up front
+                while not exhausted and len(in_flight) < window:
+                    item = next(items, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    name, student_id, image_bytes = item
+                    if image_bytes is None:
+                        failed += 1
+                        yield {'index': index, 'file': name, 'student_id': student_id, 'success': False,
+                               'message': 'Could not parse student id from filename' if student_id is None
+                               else 'Student not found'}
+                    else:
+                        future = pool.submit(encode_enrollment_image, image_bytes)
+                        in_flight[future] = (index, name, student_id)
+                    index += 1
+                
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item_index, name, student_id = in_flight.pop(future)
+                    try:
+                        encoding, error, _ = future.result()
+                    except Exception as e:
+                        encoding, error = None, str(e)
+                    
+                    if encoding is None:
+                        failed += 1
+                    else:
+                        encodings.append({'student_id': student_id, 'encoding': encoding.tobytes()})
+                    yield {'index': item_index, 'file': name, 'student_id': student_id,
+                           'success': encoding is not None, 'message': error or 'Face encoded'}
+        finally:
+            # Stop early if the client went away before every image was encoded
+            for future in in_flight:
+                future.cancel()
+            pool.shutdown()
+        
+        encode_seconds = time.perf_counter() - started
+        try:
+            last_id = db.session.query(db.func.max(FaceEncoding.id)).scalar() or 0
+            if encodings:
+                db.session.execute(FaceEncoding.__table__.insert(), [
+                    dict(row, created_at=datetime.utcnow()) for row in encodings
+                ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            yield {'summary': {'images': index, 'enrolled': 0, 'failed': index,
+                               'error': f"Error saving encodings: {str(e)}"}}
+            return
+        
+        # Add the whole batch to the shared gallery at once. Rows enrolled concurrently elsewhere since last_id
+        # are included too, SharedGallery.add skips the ones already in the gallery files
+        new_rows = db.session.query(
+            FaceEncoding.id,
+            FaceEncoding.student_id,
+            FaceEncoding.encoding
+        ).filter(FaceEncoding.id > last_id).order_by(FaceEncoding.id).all()
+        self.gallery.add(current_app._get_current_object(), [
+            (row.id, row.student_id, np.frombuffer(row.encoding, dtype=np.float32)) for row in new_rows
+        ])
+        elapsed = time.perf_counter() - started
+        
+        yield {'summary': {
+            'images': index,
+            'enrolled': len(encodings),
+            'failed': failed,
+            'encode_seconds': round(encode_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'images_per_second': round(index / elapsed, 1) if elapsed > 0 else None
+        }}
+
+# One service, and so one gallery, per process shared by every blueprint
+face_recognition_service = FaceRecognitionService()
\ No newline at end of file
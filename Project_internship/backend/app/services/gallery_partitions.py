@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from flask import current_app
+from app.models.class_model import Class
+from app.models.student import Student
+from app.services.face_matcher import BruteForceMatcher
+from app import db
+
+class GalleryPartition:
+    """The gallery rows of one class or room, with an exact matcher over just those rows"""
+    
+    def __init__(self, version, student_ids, encodings):
+        self.version = version
+        self.student_ids = student_ids
+        self.matcher = BruteForceMatcher()
+        self.matcher.build(encodings)
+    
+    def __len__(self):
+        return len(self.student_ids)
+
+class PartitionStats:
+    """Lookups of one partition: scoped hits, global fallbacks and recent latencies"""
+    
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.fallback_hits = 0
+        self.latencies = deque(maxlen=1000)  # Seconds per lookup, fallback included
+    
+    def to_dict(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.lookups, 4) if self.lookups else None,
+            'fallbacks': self.fallbacks,
+            'fallback_hits': self.fallback_hits,
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 3),
+                'p95': round(float(np.percentile(latencies, 95)), 3)
+            } if len(latencies) else None
+        }
+
+class GalleryPartitions:
+    """Per-process gallery subsets keyed by ('class', class ID) or ('room', room number).
+    
+    A room covers every class whose room_number it is. The class rosters are loaded
+    with one query and kept until invalidate() is called (creating a student or a
+    class does) or GALLERY_PARTITION_TTL seconds have passed. A partition is built
+    from the gallery snapshot on first use and rebuilt when a newer snapshot is
+    searched, so new enrollments show up in it.
+    """
+    
+    def __init__(self):
+        self.rosters = None  # ('class', ID) or ('room', number) -> student IDs
+        self.expires_at = 0.0
+        self.partitions = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+    
+    def _load(self):
+        rosters = {}
+        for student_id, class_id, room_number in db.session.query(
+            Student.id,
+            Student.class_id,
+            Class.room_number
+        ).join(Class, Student.class_id == Class.id):
+            rosters.setdefault(('class', class_id), []).append(student_id)
+            if room_number:
+                rosters.setdefault(('room', room_number), []).append(student_id)
+        return rosters
+    
+    def _roster(self, key):
+        now = time.monotonic()
+        if self.rosters is None or now >= self.expires_at:
+            self.rosters = self._load()
+            self.partitions = {}
+            self.expires_at = now + current_app.config['GALLERY_PARTITION_TTL']
+        return self.rosters.get(key)
+    
+    def get(self, snapshot, key):
+        """Return the partition of key for the snapshot, or None if no student belongs to key"""
+        with self.lock:
+            partition = self.partitions.get(key)
+            if partition is not None and partition.version == snapshot.version:
+                return partition
+            
+            roster = self._roster(key)
+            if not roster:
+                return None
+            rows = np.flatnonzero(np.isin(snapshot.student_ids, np.asarray(roster, dtype=np.int64)))
+            partition = GalleryPartition(snapshot.version, snapshot.student_ids[rows], snapshot.encodings[rows])
+            self.partitions[key] = partition
+            return partition
+    
+    def record(self, key, hit, fallback, fallback_hit, seconds):
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = PartitionStats()
+            stats.lookups += 1
+            stats.hits += hit
+            stats.fallbacks += fallback
+            stats.fallback_hits += fallback_hit
+            stats.latencies.append(seconds)
+    
+    def metrics(self):
+        with self.lock:
+            return {
+                (f'{key[0]}:{key[1]}' if isinstance(key, tuple) else key): dict(
+                    stats.to_dict(),
+                    size=len(self.partitions[key]) if key in self.partitions else None
+                )
+                for key, stats in self.stats.items()
+            }
+    
+    def invalidate(self):
+        with self.lock:
+            self.rosters = None
+            self.partitions = {}
\ No newline at end of file
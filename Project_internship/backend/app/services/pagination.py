@@ -0,0 +1,35 @@
+import base64
+import json
+from flask import current_app
+
+def encode_cursor(values):
+    """Opaque next_cursor token for the sort key of the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Sort key stored in a token from encode_cursor, raises ValueError if it is not one"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def page_size(args):
+    """The limit query parameter, PAGE_SIZE by default and capped at PAGE_SIZE_MAX"""
+    limit = args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['PAGE_SIZE_MAX']))
+
+def paginated(args):
+    """Whether the client asked for pages, clients sending neither cursor nor limit get a plain list"""
+    return 'cursor' in args or 'limit' in args
+
+def keyset_page(query, limit, sort_key):
+    """Fetch one page from a query already filtered past the cursor and ordered by it.
+    
+    One extra row is read to tell whether there is a next page; next_cursor is None
+    on the last page. A limit of None fetches every row as a single page.
+    """
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(sort_key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
\ No newline at end of file
@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+from flask import current_app
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue already holds its maximum number of requests"""
+
+def hash_password(password, rounds):
+    """Worker process entry point: bcrypt hash of password with 2^rounds iterations"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def check_password(password, password_hash):
+    """Worker process entry point: whether password matches the bcrypt hash (never for a malformed hash)"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False
+
+def hash_rounds(password_hash):
+    """Cost factor stored in a bcrypt hash ("$2b$12$..."), or None for a malformed or legacy hash"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """Runs bcrypt in a small bounded process pool instead of the request threads.
+    
+    The pool size caps how many cores hashing can take, so a burst of logins
+    cannot starve the other endpoints, and the queue bound turns an overload into
+    a fast HasherBusy instead of an ever-growing backlog. A job holds its queue
+    slot until the pool is done with it, also when the request gave up waiting
+    after BCRYPT_TIMEOUT. BCRYPT_WORKERS = 0 hashes in the calling thread.
+    """
+    
+    def __init__(self):
+        self.pool = None
+        self.lock = threading.Lock()
+        self.pending = 0
+    
+    def _run(self, function, *args):
+        config = current_app.config
+        if not config['BCRYPT_WORKERS']:
+            return function(*args)
+        
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=config['BCRYPT_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            if self.pending >= config['BCRYPT_QUEUE_SIZE']:
+                raise HasherBusy("Too many password checks in progress, try again")
+            self.pending += 1
+        
+        try:
+            future = self.pool.submit(function, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        
+        try:
+            return future.result(config['BCRYPT_TIMEOUT'])
+        except FutureTimeout:
+            future.cancel()  # Frees the slot now if no worker picked it up yet
+            raise HasherBusy("Password check timed out, try again")
+    
+    def _release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+    
+    def hash(self, password):
+        return self._run(hash_password, password, current_app.config['BCRYPT_LOG_ROUNDS'])
+    
+    def verify(self, password, password_hash):
+        return self._run(check_password, password, password_hash)
+    
+    def needs_rehash(self, password_hash):
+        """Whether the hash was made with another cost factor than BCRYPT_LOG_ROUNDS, or is not a bcrypt hash"""
+        return hash_rounds(password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
+
+password_hasher = PasswordHasher()
\ No newline at end of file
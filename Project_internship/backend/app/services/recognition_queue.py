@@ -0,0 +1,223 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import numpy as np
+from app.services.face_recognition_service import encode_image
+
+class QueueFull(Exception):
+    """Raised when the recognition queue already holds its maximum number of jobs"""
+
+class RecognitionTimeout(Exception):
+    """Raised when an image was not encoded within the caller's timeout"""
+
+def encode_job(image_data, reduction=1):
+    """Worker process entry point: decode and encode the image, return (encodings, seconds spent)"""
+    started = time.perf_counter()
+    encodings = [np.asarray(encoding, dtype=np.float32) for encoding in encode_image(image_data, reduction)]
+    return encodings, time.perf_counter() - started
+
+class RecognitionJob:
+    def __init__(self, job_id, location=None, class_id=None, room=None):
+        self.id = job_id
+        self.location = location
+        self.class_id = class_id
+        self.room = room
+        self.status = 'queued'  # queued, done, failed
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+    
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at
+        }
+
+class RecognitionQueue:
+    """Bounded queue of face recognition jobs in front of a process pool.
+    
+    Decoding and encoding images (the expensive part) runs in worker processes, so
+    recognition scales with cores instead of holding Flask threads. Matching the
+    encodings and recording attendance run on one finisher thread in the app process.
+    The queue lives in this process: jobs are lost on restart and each app process
+    has its own pool.
+    """
+    
+    def __init__(self, face_recognition_service, attendance_service):
+        self.face_recognition_service = face_recognition_service
+        self.attendance_service = attendance_service
+        self.pool = None
+        self.finisher = None
+        self.app = None
+        self.max_pending = None
+        self.result_ttl = None
+        self.reduction = 1
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.pending = 0
+        self.finished = queue.Queue()
+        
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=1000)  # Seconds from submit to finished of recent jobs
+        self.encode_times = deque(maxlen=1000)  # Seconds spent encoding in the workers
+    
+    def _start(self, app):
+        """Create the worker pool and the finisher thread on first use, and a new pool after a worker crash"""
+        with self.lock:
+            if self.pool is not None:
+                return
+            
+            self.app = app
+            self.max_pending = app.config['RECOGNITION_QUEUE_SIZE']
+            self.result_ttl = app.config['RECOGNITION_RESULT_TTL']
+            self.reduction = app.config['FACE_DECODE_REDUCTION']
+            # Spawned workers do not inherit the database connections and threads of the app process
+            self.pool = ProcessPoolExecutor(
+                max_workers=app.config['RECOGNITION_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            if self.finisher is None:
+                self.finisher = threading.Thread(target=self._finish_jobs, name='recognition-finisher', daemon=True)
+                self.finisher.start()
+    
+    def _submit_encoding(self, image_data, reduction=None):
+        """Send the image to the pool; on failure give back the slot taken by _reserve() and re-raise"""
+        if isinstance(image_data, memoryview):
+            image_data = image_data.tobytes()  # Sent to the worker process, which needs a picklable copy
+        pool = self.pool
+        try:
+            return pool.submit(encode_job, image_data, reduction or self.reduction)
+        except Exception as e:
+            with self.lock:
+                # No done callback was attached, so nothing else will release the slot
+                self.pending -= 1
+                self.failed += 1
+                if isinstance(e, BrokenProcessPool) and self.pool is pool:
+                    self.pool = None  # A worker died, the next request starts a new pool
+            raise
+    
+    def _reserve(self):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"Recognition queue is full ({self.max_pending} jobs)")
+            self.pending += 1
+            self.submitted += 1
+    
+    def _release(self, submitted_at, future):
+        with self.lock:
+            self.pending -= 1
+            self.latencies.append(time.time() - submitted_at)
+            if not future.cancelled() and future.exception() is None:
+                self.encode_times.append(future.result()[1])
+    
+    def encode(self, app, image_data, timeout=None, reduction=None):
+        """Encode an image (base64 or bytes) in the pool and wait for its face encodings.
+        
+        Raises QueueFull when the queue is full and RecognitionTimeout when the encodings
+        are not back within timeout seconds.
+        """
+        self._start(app)
+        self._reserve()
+        submitted_at = time.time()
+        future = self._submit_encoding(image_data, reduction)
+        future.add_done_callback(lambda future: self._release(submitted_at, future))
+        try:
+            return future.result(timeout)[0]
+        except FutureTimeout:
+            future.cancel()  # Still waiting for a worker, nobody needs it anymore
+            raise RecognitionTimeout(f"Face recognition took longer than {timeout:g} seconds")
+    
+    def submit(self, app, image_data, location=None, class_id=None, room=None):
+        """Queue a recognize-and-record job and return it without waiting; raises QueueFull when the queue is full"""
+        self._start(app)
+        self._reserve()
+        job = RecognitionJob(uuid.uuid4().hex, location, class_id, room)
+        future = self._submit_encoding(image_data)
+        with self.lock:
+            self._expire_jobs()
+            self.jobs[job.id] = job
+        
+        future.add_done_callback(lambda future: self.finished.put((job, future)))
+        return job
+    
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def _expire_jobs(self):
+        """Forget finished jobs older than the result TTL (called with the lock held)"""
+        deadline = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < deadline]
+        for job_id in expired:
+            del self.jobs[job_id]
+    
+    def _finish_jobs(self):
+        """Match the encoded faces and record attendance, one job at a time"""
+        while True:
+            job, future = self.finished.get()
+            
+            with self.app.app_context():
+                try:
+                    encodings, _ = future.result()
+                    student_id = self.face_recognition_service.match_encodings(
+                        encodings,
+                        class_id=job.class_id,
+                        room=job.room
+                    )
+                    if not student_id:
+                        job.error = 'Face not recognized'
+                    else:
+                        success, message = self.attendance_service.record_attendance(
+                            student_id=student_id,
+                            attendance_type='face',
+                            location=job.location
+                        )
+                        job.result = {'student_id': student_id, 'success': success, 'message': message}
+                except Exception as e:
+                    job.error = str(e)
+            
+            with self.lock:
+                job.status = 'failed' if job.error else 'done'
+                job.finished_at = time.time()
+                if job.error:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            self._release(job.submitted_at, future)
+    
+    def metrics(self):
+        """Queue depth, job counters and recent latency percentiles in milliseconds"""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            encode_times = np.array(self.encode_times) * 1000
+            return {
+                'depth': self.pending,
+                'capacity': self.max_pending,
+                'waiting_to_finish': self.finished.qsize(),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'latency_ms': {
+                    'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                    'p95': float(np.percentile(latencies, 95)) if len(latencies) else None
+                },
+                'encode_ms': {
+                    'p50': float(np.percentile(encode_times, 50)) if len(encode_times) else None,
+                    'p95': float(np.percentile(encode_times, 95)) if len(encode_times) else None
+                }
+            }
\ No newline at end of file
@@ -0,0 +1,39 @@
+import hashlib
+import threading
+import time
+from flask import current_app, json, request
+
+class ResponseCache:
+    """Per-process cache of one JSON response body, rebuilt at most every ttl_key seconds.
+    
+    Responses carry an ETag of the body, so a client polling with If-None-Match gets a
+    304 Not Modified while the body is unchanged. While the entry is fresh neither the
+    body nor the 304 touch the database.
+    """
+    
+    def __init__(self, ttl_key):
+        self.ttl_key = ttl_key
+        self.entry = None  # (expires at, body, etag)
+        self.lock = threading.Lock()
+    
+    def respond(self, build):
+        """Return the cached response, calling build() for a new JSON-serializable body when it expired"""
+        now = time.monotonic()
+        entry = self.entry
+        if entry is None or entry[0] <= now:
+            # One request rebuilds, the others wait for it instead of all querying at once
+            with self.lock:
+                entry = self.entry
+                if entry is None or entry[0] <= now:
+                    body = json.dumps(build())
+                    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+                    entry = self.entry = (now + current_app.config[self.ttl_key], body, etag)
+        
+        response = current_app.response_class(entry[1], mimetype='application/json')
+        response.set_etag(entry[2])
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    
+    def invalidate(self):
+        with self.lock:
+            self.entry = None
\ No newline at end of file
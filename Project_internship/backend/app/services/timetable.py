@@ -0,0 +1,73 @@
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from flask import current_app
+from app.models.class_model import Schedule
+from app import db
+
+class TimetableIndex:
+    """Per-process weekly timetable: (class ID, weekday) -> sorted period start and end times.
+    
+    All schedules are loaded with one query and kept until invalidate() is called
+    (create_schedule does) or TIMETABLE_TTL seconds have passed, which is how other
+    processes pick up a new schedule.
+    """
+    
+    def __init__(self):
+        self.periods = None  # (class ID, weekday) -> ([start times], [end times])
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+    
+    def _load(self):
+        periods = {}
+        for class_id, day_of_week, start_time, end_time in db.session.query(
+            Schedule.class_id,
+            Schedule.day_of_week,
+            Schedule.start_time,
+            Schedule.end_time
+        ).order_by(Schedule.start_time, Schedule.id):
+            starts, ends = periods.setdefault((class_id, day_of_week), ([], []))
+            starts.append(start_time)
+            ends.append(end_time)
+        return periods
+    
+    def _periods(self, class_id, weekday):
+        now = time.monotonic()
+        with self.lock:
+            if self.periods is None or now >= self.expires_at:
+                self.periods = self._load()
+                self.expires_at = now + current_app.config['TIMETABLE_TTL']
+            return self.periods.get((class_id, weekday))
+    
+    def period_start(self, class_id, punch_time):
+        """Start of the period a punch counts for, or None if the class has no period that day.
+        
+        That is the period running at punch_time, else the next one to start, else the
+        last period of the day. Found by binary search on the start times.
+        """
+        periods = self._periods(class_id, punch_time.weekday())
+        if not periods:
+            return None
+        
+        starts, ends = periods
+        current = punch_time.time()
+        index = bisect_left(starts, current)  # Periods before index started before the punch
+        if index > 0 and current < ends[index - 1]:
+            index -= 1
+        elif index == len(starts):
+            index -= 1
+        return datetime.combine(punch_time.date(), starts[index])
+    
+    def status(self, class_id, punch_time):
+        """"present" or "late" for a punch, or None if the class has no period that day"""
+        start = self.period_start(class_id, punch_time)
+        if start is None:
+            return None
+        return "late" if punch_time > start else "present"
+    
+    def invalidate(self):
+        with self.lock:
+            self.periods = None
+
+timetable = TimetableIndex()
\ No newline at end of file
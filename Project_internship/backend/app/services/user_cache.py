@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.models.user import User
+from app import db
+
+class UserCache:
+    """Per-process TTL + LRU cache of user.to_dict() by user ID.
+    
+    Users updated or deleted through the ORM in this process are invalidated right
+    away; other processes see the change once their entry expires (USER_CACHE_TTL).
+    """
+    
+    def __init__(self):
+        self.entries = OrderedDict()  # user ID -> (expires at, user dict or None)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id):
+        """Return the user as a dict, or None if there is no such user"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        user = User.query.get(user_id)
+        user_dict = user.to_dict() if user else None
+        
+        config = current_app.config
+        with self.lock:
+            self.entries[user_id] = (now + config['USER_CACHE_TTL'], user_dict)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > config['USER_CACHE_SIZE']:
+                self.entries.popitem(last=False)
+        return user_dict
+    
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+user_cache = UserCache()
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, user):
+    # Drop the entry now, and again after the commit in case a request re-cached the old row in between
+    user_cache.invalidate(user.id)
+    object_session(user).info.setdefault('changed_users', set()).add(user.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _users_committed(session):
+    for user_id in session.info.pop('changed_users', ()):
+        user_cache.invalidate(user_id)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""Compare decoding a JSON/base64 image payload with the binary upload path.
+
+Run from the backend folder:
+
+    python -m benchmarks.decode_benchmark --width 1920 --height 1080 --reduction 2
+
+The JSON path parses the request body, base64-decodes the image and decodes it at
+full resolution with PIL (what face_recognition.load_image_file does). The binary
+path decodes the raw body in place with cv2.imdecode, at 1/reduction resolution.
+Each path runs in a fresh process and the peak RSS of its first decode is read
+from /proc (Linux only), so it is not hidden by memory another run allocated.
+"""
+import argparse
+import base64
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2
+
+def make_jpeg(width, height, quality=90):
+    """A synthetic photo-like JPEG: smooth gradients with some noise"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    image = np.clip(image + rng.normal(0, 12, image.shape), 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+def json_path(body):
+    from PIL import Image
+    data = json.loads(body)
+    image_data = data['image']
+    if ',' in image_data:
+        image_data = image_data.split(',', 1)[1]
+    return np.array(Image.open(io.BytesIO(base64.b64decode(image_data))).convert('RGB'))
+
+def binary_path(body, reduction):
+    from app.services.face_recognition_service import decode_image_bytes
+    return decode_image_bytes(memoryview(body), reduction)
+
+def memory_status_kb(field):
+    """VmRSS (current) or VmHWM (peak) of this process, in KiB (Linux only)"""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS, so it only tracks what runs next"""
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+def measure(mode, jpeg_file, reduction, repeat):
+    """Run one path in this process and print a JSON line with its timings and memory"""
+    with open(jpeg_file, 'rb') as file:
+        jpeg = file.read()
+    if mode == 'json':
+        body = json.dumps({'image': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()}).encode()
+        decode = lambda: json_path(body)
+    else:
+        body = jpeg
+        decode = lambda: binary_path(body, reduction)
+    
+    # Import the decoders before taking the memory baseline
+    from PIL import Image
+    import app.services.face_recognition_service
+    
+    # Peak memory of a single decode, the payload itself is already in memory like a request body
+    reset_peak_rss()
+    baseline = memory_status_kb('VmRSS')
+    shape = decode().shape
+    peak_increase = memory_status_kb('VmHWM') - baseline
+    
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        image = decode()
+        latencies.append((time.perf_counter() - started) * 1000)
+        del image
+    
+    print(json.dumps({
+        'mode': mode,
+        'body_bytes': len(body),
+        'shape': list(shape),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'peak_rss_increase_kb': peak_increase
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--reduction', type=int, default=2, choices=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--measure', choices=['json', 'binary'], help=argparse.SUPPRESS)
+    parser.add_argument('--jpeg-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        measure(args.measure, args.jpeg_file, args.reduction, args.repeat)
+        return
+    
+    # Build the test image here, its temporary arrays would raise the peak RSS of the measuring processes
+    jpeg_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False).name
+    with open(jpeg_file, 'wb') as file:
+        file.write(make_jpeg(args.width, args.height))
+    
+    results = {}
+    for mode in ('json', 'binary'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.decode_benchmark', '--measure', mode, '--jpeg-file', jpeg_file,
+             '--reduction', str(args.reduction), '--repeat', str(args.repeat)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    
+    json_result, binary_result = results['json'], results['binary']
+    print(f"{args.width}x{args.height} JPEG, binary path decoded at 1/{args.reduction} resolution")
+    for result in (json_result, binary_result):
+        print(f"{result['mode']:>6}: body {result['body_bytes'] / 1024:7.1f} KiB, image {result['shape']}, "
+              f"p50 {result['p50_ms']:6.2f} ms, peak RSS +{result['peak_rss_increase_kb'] / 1024:6.1f} MiB")
+    print(f"Saved per request: {json_result['p50_ms'] - binary_result['p50_ms']:.2f} ms, "
+          f"{(json_result['peak_rss_increase_kb'] - binary_result['peak_rss_increase_kb']) / 1024:.1f} MiB peak RSS")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Compare a buffered JSON attendance dump with the streamed export.
+
+Run from the backend folder:
+
+    python -m benchmarks.export_benchmark --students 1000 --days 365
+
+Seeds a throwaway SQLite database, then fetches every record of the range as one
+JSON document built from ORM objects (what the per-student and per-class endpoints
+do) and through GET /api/attendance/export in each format, reporting the time to
+first byte, the total time and the peak Python memory of each.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from benchmarks.report_benchmark import seed
+
+def buffered_dump(start_date, end_date):
+    """Every record as a dict, serialized in one piece"""
+    from flask import jsonify
+    from app.models.attendance import Attendance
+    
+    records = Attendance.query.filter(
+        Attendance.date >= start_date,
+        Attendance.date <= end_date
+    ).all()
+    return jsonify([record.to_dict() for record in records]).get_data()
+
+def measure(fetch):
+    """Run fetch, which yields chunks, return (first byte seconds, total seconds, bytes, peak MiB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in fetch():
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, size, peak / 2 ** 20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--class-size', type=int, default=60)
+    args = parser.parse_args()
+    
+    database = os.path.join(tempfile.mkdtemp(), 'export_benchmark.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    
+    app = create_app()
+    start_date = date(2024, 1, 1)
+    end_date = start_date + timedelta(days=args.days - 1)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed(db, args.students, args.days, args.class_size, start_date)
+        print(f"Seeded {args.students} students x {args.days} days in {time.perf_counter() - started:.1f}s")
+        token = create_access_token(identity=1)
+    
+    def buffered():
+        with app.app_context():
+            yield buffered_dump(start_date, end_date)
+    
+    def streamed(export_format):
+        def fetch():
+            client = app.test_client()
+            response = client.get(
+                f'/api/attendance/export?format={export_format}&start_date={start_date}&end_date={end_date}',
+                headers={'Authorization': f'Bearer {token}'},
+                buffered=False
+            )
+            assert response.status_code == 200, response.status_code
+            yield from response.response
+            response.close()
+        return fetch
+    
+    for label, fetch in (('Buffered JSON:', buffered), ('Export csv:   ', streamed('csv')),
+                         ('Export ndjson:', streamed('ndjson')), ('Export xlsx:  ', streamed('xlsx'))):
+        first_byte, total, size, peak = measure(fetch)
+        print(f"{label} first byte {first_byte * 1000:8.1f} ms, total {total:6.2f}s, "
+              f"{size / 2 ** 20:6.1f} MiB, peak memory {peak:7.1f} MiB")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
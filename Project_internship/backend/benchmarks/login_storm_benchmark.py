@@ -0,0 +1,100 @@
+"""Measure attendance endpoint latency while a storm of logins is in flight.
+
+Run from the backend folder:
+
+    python -m benchmarks.login_storm_benchmark --login-threads 16 --seconds 5 --workers 2
+
+A probe thread keeps calling GET /api/attendance/summary/<class_id> while
+login threads keep posting to /api/auth/login. This runs three times: with no
+logins, with bcrypt inline in the request threads (BCRYPT_WORKERS=0) and with
+bcrypt in the hashing pool.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+def percentiles(latencies):
+    if not latencies:
+        return "no requests"
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return f"p50 {p50:6.1f} ms, p95 {p95:6.1f} ms, p99 {p99:6.1f} ms ({len(latencies)} requests)"
+
+def run(app, token, login_threads, seconds):
+    """Probe the attendance endpoint for seconds while login_threads threads log in, return both latencies"""
+    stop = threading.Event()
+    probe_latencies = []
+    login_latencies = []
+    
+    def probe():
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get('/api/attendance/summary/1?start_date=2024-01-01&end_date=2024-01-31', headers=headers)
+            assert response.status_code == 200, response.get_json()
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+    
+    def login():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'email': 'storm@example.com', 'password': 'secret'})
+            if response.status_code == 200:
+                login_latencies.append(time.perf_counter() - started)
+    
+    threads = [threading.Thread(target=probe)] + [threading.Thread(target=login) for _ in range(login_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return probe_latencies, login_latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='bcrypt pool size')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost (log2 rounds)')
+    args = parser.parse_args()
+    
+    database = os.path.join(tempfile.mkdtemp(), 'login_storm.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from app.models.class_model import Class
+    from app.models.user import User
+    
+    app = create_app()
+    app.config['BCRYPT_LOG_ROUNDS'] = args.rounds
+    app.config['BCRYPT_QUEUE_SIZE'] = args.login_threads * 2
+    with app.app_context():
+        db.create_all()
+        db.session.add(Class(name='Class 1', academic_year='2024-2025'))
+        app.config['BCRYPT_WORKERS'] = 0
+        user = User(username='storm', email='storm@example.com', role='teacher')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=user.id, additional_claims={'role': user.role})
+    
+    print(f"{args.login_threads} login threads for {args.seconds:.0f}s, bcrypt cost {args.rounds}, {os.cpu_count()} CPUs")
+    probe_latencies, _ = run(app, token, 0, args.seconds)
+    print(f"No logins:         attendance {percentiles(probe_latencies)}")
+    
+    for label, workers in (('Inline bcrypt:    ', 0), (f'Pool of {args.workers} workers:', args.workers)):
+        app.config['BCRYPT_WORKERS'] = workers
+        if workers:
+            run(app, token, 1, 0.5)  # Start the pool processes before measuring
+        probe_latencies, login_latencies = run(app, token, args.login_threads, args.seconds)
+        print(f"{label} attendance {percentiles(probe_latencies)}")
+        print(f"{' ' * len(label)} logins     {percentiles(login_latencies)}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
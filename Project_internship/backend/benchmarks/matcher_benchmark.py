@@ -0,0 +1,75 @@
+"""Compare the approximate IVF face matcher with exact brute force search.
+
+Run from the backend folder:
+
+    python -m benchmarks.matcher_benchmark --sizes 1000 10000 100000 --probes 8
+
+Reports recall@1 (how often the IVF match is the exact nearest neighbour) and
+p50/p99 single-probe match latency on synthetic 128-d identities.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.face_matcher import ENCODING_SIZE, create_matcher
+
+def make_identities(count, rng, n_groups=256, spread=0.35):
+    """Synthetic encodings with some group structure, like real face embeddings"""
+    groups = rng.normal(0, 0.1, size=(n_groups, ENCODING_SIZE))
+    identities = groups[rng.integers(0, n_groups, size=count)]
+    identities += rng.normal(0, spread / np.sqrt(ENCODING_SIZE), size=(count, ENCODING_SIZE))
+    return identities.astype(np.float32)
+
+def make_probes(identities, count, rng, noise=0.3):
+    """New captures of enrolled people, about `noise` away from their enrolled encoding"""
+    targets = rng.integers(0, len(identities), size=count)
+    probes = identities[targets] + rng.normal(0, noise / np.sqrt(ENCODING_SIZE), size=(count, ENCODING_SIZE))
+    return probes.astype(np.float32)
+
+def time_queries(matcher, probes):
+    """Match the probes one at a time, as the attendance endpoint does"""
+    latencies = []
+    indices = []
+    for probe in probes:
+        start = time.perf_counter()
+        index, _ = matcher.search(probe[None, :])
+        latencies.append((time.perf_counter() - start) * 1000)
+        indices.append(index[0])
+    return np.array(indices), np.array(latencies)
+
+def run(size, args, rng):
+    identities = make_identities(size, rng)
+    probes = make_probes(identities, args.queries, rng)
+    
+    exact = create_matcher('exact')
+    exact.build(identities)
+    
+    start = time.perf_counter()
+    ivf = create_matcher('ivf', n_lists=args.lists, n_probe=args.probes, n_iter=args.iterations)
+    ivf.build(identities)
+    build_seconds = time.perf_counter() - start
+    
+    exact_indices, exact_latencies = time_queries(exact, probes)
+    ivf_indices, ivf_latencies = time_queries(ivf, probes)
+    recall = np.mean(exact_indices == ivf_indices)
+    
+    print(f"{size:>8} identities  (IVF: {len(ivf.centroids)} lists, {args.probes} probes, built in {build_seconds:.1f}s)")
+    for name, latencies in (('exact', exact_latencies), ('ivf', ivf_latencies)):
+        print(f"    {name:<6} p50 {np.percentile(latencies, 50):8.3f} ms   p99 {np.percentile(latencies, 99):8.3f} ms")
+    print(f"    recall@1 {recall:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--lists', type=int, default=None, help='IVF lists (default: sqrt of gallery size)')
+    parser.add_argument('--probes', type=int, default=8, help='IVF lists scanned per query')
+    parser.add_argument('--iterations', type=int, default=10, help='k-means iterations')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes:
+        run(size, args, rng)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
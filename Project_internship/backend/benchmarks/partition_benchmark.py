@@ -0,0 +1,87 @@
+"""Compare class-scoped gallery partitions (with global fallback) against global matching.
+
+Run from the backend folder:
+
+    python -m benchmarks.partition_benchmark --sizes 1000 10000 50000 --class-size 60
+
+Students are split into classes of --class-size. Each probe is a new capture of
+an enrolled student punching at their own class's kiosk, and is matched either
+against the whole gallery or against the class partition first, falling back to
+the whole gallery when the partition has no match within the tolerance. Reports
+p50/p99 match latency, how often the probe was given to the wrong student (a
+false accept) or to nobody, and how often the scoped search fell back.
+"""
+import argparse
+import time
+from types import SimpleNamespace
+import numpy as np
+from app.services.face_matcher import create_matcher
+from app.services.gallery_partitions import GalleryPartition
+from benchmarks.matcher_benchmark import make_identities
+
+def search(matcher, student_ids, probe, tolerance):
+    indices, distances = matcher.search(probe[None, :])
+    if indices[0] < 0 or distances[0] > tolerance:
+        return None
+    return int(student_ids[indices[0]])
+
+def run(size, args, rng):
+    identities = make_identities(size, rng, spread=args.spread)
+    student_ids = np.arange(size, dtype=np.int64)
+    classes = student_ids // args.class_size
+    targets = rng.integers(0, size, size=args.queries)
+    probes = identities[targets] + rng.normal(0, args.noise / np.sqrt(identities.shape[1]),
+                                               size=(args.queries, identities.shape[1])).astype(np.float32)
+    
+    gallery = create_matcher('exact')
+    gallery.build(identities)
+    snapshot = SimpleNamespace(version=1, student_ids=student_ids, encodings=identities)
+    partitions = {}
+    
+    results = {'global': [], 'scoped': []}
+    fallbacks = 0
+    for target, probe in zip(targets, probes):
+        start = time.perf_counter()
+        student_id = search(gallery, student_ids, probe, args.tolerance)
+        results['global'].append((student_id, time.perf_counter() - start))
+        
+        class_id = int(classes[target])
+        if class_id not in partitions:
+            rows = np.flatnonzero(classes == class_id)
+            partitions[class_id] = GalleryPartition(snapshot.version, student_ids[rows], identities[rows])
+        partition = partitions[class_id]
+        
+        start = time.perf_counter()
+        student_id = search(partition.matcher, partition.student_ids, probe, args.tolerance)
+        if student_id is None:
+            fallbacks += 1
+            student_id = search(gallery, student_ids, probe, args.tolerance)
+        results['scoped'].append((student_id, time.perf_counter() - start))
+    
+    print(f"{size:>8} students in classes of {args.class_size}, tolerance {args.tolerance}")
+    for name, matches in results.items():
+        found = np.array([student_id if student_id is not None else -1 for student_id, _ in matches])
+        latencies = np.array([seconds for _, seconds in matches]) * 1000
+        wrong = np.mean((found >= 0) & (found != targets))
+        missed = np.mean(found < 0)
+        print(f"    {name:<7} p50 {np.percentile(latencies, 50):8.3f} ms   p99 {np.percentile(latencies, 99):8.3f} ms"
+              f"   wrong student {wrong:6.2%}   not recognized {missed:6.2%}")
+    print(f"    scoped fell back to the whole gallery for {fallbacks / args.queries:.2%} of probes")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--class-size', type=int, default=60)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--spread', type=float, default=0.35, help='typical distance between similar-looking students')
+    parser.add_argument('--noise', type=float, default=0.3, help='distance of a capture from its enrolled encoding')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes:
+        run(size, args, rng)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
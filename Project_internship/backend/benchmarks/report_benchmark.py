@@ -0,0 +1,146 @@
+"""Compare the per-student (N+1) attendance report with the single grouped query and the daily summaries.
+
+Run from the backend folder:
+
+    python -m benchmarks.report_benchmark --students 1000 --days 180 --class-size 60
+
+Seeds a throwaway SQLite database and times generate_attendance_report for
+every class with both implementations, then the class summary read from the
+daily_class_summary table.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+def legacy_report(class_id, start_date, end_date):
+    """The previous implementation: one attendance query per student, counted in Python"""
+    from app.models.attendance import Attendance
+    from app.models.student import Student
+    
+    students = Student.query.filter_by(class_id=class_id).all()
+    report = []
+    
+    for student in students:
+        attendance_records = Attendance.query.filter(
+            Attendance.student_id == student.id,
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        ).all()
+        
+        total_days = (end_date - start_date).days + 1
+        present_days = sum(1 for record in attendance_records if record.status == "present")
+        late_days = sum(1 for record in attendance_records if record.status == "late")
+        absent_days = total_days - present_days - late_days
+        
+        report.append({
+            'student_id': student.id,
+            'student_name': f"{student.first_name} {student.last_name}",
+            'roll_number': student.roll_number,
+            'total_days': total_days,
+            'present_days': present_days,
+            'late_days': late_days,
+            'absent_days': absent_days,
+            'attendance_percentage': (present_days / total_days * 100) if total_days > 0 else 0
+        })
+    
+    return report
+
+def seed(db, students, days, class_size, start_date):
+    from app.models.attendance import Attendance
+    from app.models.class_model import Class
+    from app.models.student import Student
+    from app.models.user import User
+    
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    class_count = (students + class_size - 1) // class_size
+    
+    db.session.execute(Class.__table__.insert(), [
+        {'id': i + 1, 'name': f'Class {i + 1}', 'academic_year': '2023-2024', 'created_at': now, 'updated_at': now}
+        for i in range(class_count)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {'id': i + 1, 'username': f'student{i + 1}', 'email': f'student{i + 1}@example.com',
+         'password_hash': '-', 'role': 'student', 'created_at': now, 'updated_at': now}
+        for i in range(students)
+    ])
+    db.session.execute(Student.__table__.insert(), [
+        {'id': i + 1, 'user_id': i + 1, 'roll_number': f'R{i + 1:05d}', 'first_name': 'Student',
+         'last_name': str(i + 1), 'class_id': i // class_size + 1, 'created_at': now, 'updated_at': now}
+        for i in range(students)
+    ])
+    
+    for day in range(days):
+        current = start_date + timedelta(days=day)
+        rows = []
+        for student_id in range(1, students + 1):
+            roll = rng.random()
+            if roll < 0.1:
+                continue  # Absent
+            punch_in = datetime.combine(current, datetime.min.time()) + timedelta(hours=9)
+            rows.append({
+                'student_id': student_id,
+                'date': current,
+                'punch_in_time': punch_in,
+                'status': 'late' if roll < 0.25 else 'present',
+                'attendance_type': 'face',
+                'created_at': now,
+                'updated_at': now
+            })
+        db.session.execute(Attendance.__table__.insert(), rows)
+    
+    db.session.commit()
+    return class_count
+
+def time_reports(report, class_count, start_date, end_date):
+    started = time.perf_counter()
+    results = [report(class_id, start_date, end_date) for class_id in range(1, class_count + 1)]
+    return time.perf_counter() - started, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--class-size', type=int, default=60)
+    args = parser.parse_args()
+    
+    database = os.path.join(tempfile.mkdtemp(), 'report_benchmark.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    
+    from app import create_app, db
+    from app.services.attendance_service import AttendanceService
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        
+        start_date = date(2024, 1, 1)
+        end_date = start_date + timedelta(days=args.days - 1)
+        
+        started = time.perf_counter()
+        class_count = seed(db, args.students, args.days, args.class_size, start_date)
+        print(f"Seeded {args.students} students x {args.days} days in {class_count} classes "
+              f"in {time.perf_counter() - started:.1f}s")
+        
+        service = AttendanceService()
+        legacy_seconds, legacy_results = time_reports(legacy_report, class_count, start_date, end_date)
+        db.session.expunge_all()
+        grouped_seconds, grouped_results = time_reports(service.generate_attendance_report, class_count, start_date, end_date)
+        
+        assert legacy_results == grouped_results, "Reports differ"
+        
+        print(f"N+1 report:     {legacy_seconds * 1000 / class_count:8.1f} ms per class ({legacy_seconds:.2f}s total)")
+        print(f"Grouped report: {grouped_seconds * 1000 / class_count:8.1f} ms per class ({grouped_seconds:.2f}s total)")
+        print(f"Speedup: {legacy_seconds / grouped_seconds:.1f}x")
+        
+        started = time.perf_counter()
+        rows = service.rebuild_daily_summaries(start_date, end_date)
+        print(f"Rebuilt {rows} daily class summaries in {time.perf_counter() - started:.2f}s")
+        summary_seconds, _ = time_reports(service.get_class_summary, class_count, start_date, end_date)
+        print(f"Summary report: {summary_seconds * 1000 / class_count:8.1f} ms per class ({summary_seconds:.2f}s total)")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""add entity counters
+
+Revision ID: 9c5d58cdeb1f
+Revises: c85661f2fd19
+Create Date: 2026-10-18 19:36:44.121811
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c5d58cdeb1f'
+down_revision = 'c85661f2fd19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('entity_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Seed the counters with the current row counts, the create endpoints keep them up to date
+    for name in ('students', 'teachers', 'classes'):
+        op.execute(
+            f"INSERT INTO entity_counters (name, value, updated_at) "
+            f"SELECT '{name}', COUNT(*), CURRENT_TIMESTAMP FROM {name}"
+        )
+
+
+def downgrade():
+    op.drop_table('entity_counters')
@@ -0,0 +1,68 @@
+"""add attendance indexes
+
+Revision ID: c85661f2fd19
+Revises: 32d95e81908c
+Create Date: 2026-10-18 19:33:38.635150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c85661f2fd19'
+down_revision = '32d95e81908c'
+branch_labels = None
+depends_on = None
+
+
+DUPLICATES = "SELECT MIN(id) FROM attendance GROUP BY student_id, date"
+
+# Recount one class and day of the daily summaries from the attendance that is left
+RECOUNT_SUMMARY = """
+UPDATE daily_class_summary SET
+    present = (SELECT COUNT(*) FROM attendance JOIN students ON students.id = attendance.student_id
+               WHERE students.class_id = daily_class_summary.class_id
+               AND attendance.date = daily_class_summary.date AND attendance.status = 'present'),
+    late = (SELECT COUNT(*) FROM attendance JOIN students ON students.id = attendance.student_id
+            WHERE students.class_id = daily_class_summary.class_id
+            AND attendance.date = daily_class_summary.date AND attendance.status = 'late')
+WHERE class_id = :class_id AND date = :date
+"""
+RECOUNT_ABSENT = """
+UPDATE daily_class_summary SET
+    absent = CASE WHEN enrolled > present + late THEN enrolled - present - late ELSE 0 END
+WHERE class_id = :class_id AND date = :date
+"""
+
+
+def upgrade():
+    # Keep the first record of any student counted twice on the same day, the unique
+    # constraint below now makes the duplicate check of record_attendance race-free
+    bind = op.get_bind()
+    affected = bind.execute(sa.text(
+        "SELECT DISTINCT students.class_id, attendance.date FROM attendance "
+        "JOIN students ON students.id = attendance.student_id "
+        "WHERE attendance.id NOT IN (" + DUPLICATES + ")"
+    )).fetchall()
+    op.execute("DELETE FROM attendance WHERE id NOT IN (" + DUPLICATES + ")")
+
+    # The daily summaries counted the deleted records too
+    for class_id, day in affected:
+        bind.execute(sa.text(RECOUNT_SUMMARY), {'class_id': class_id, 'date': day})
+        bind.execute(sa.text(RECOUNT_ABSENT), {'class_id': class_id, 'date': day})
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.create_unique_constraint('uq_attendance_student_date', ['student_id', 'date'])
+        batch_op.create_index('ix_attendance_date', ['date'], unique=False)
+    op.create_index('ix_schedules_class_day', 'schedules', ['class_id', 'day_of_week'], unique=False)
+    op.create_index(op.f('ix_students_class_id'), 'students', ['class_id'], unique=False)
+    op.create_index('ix_daily_class_summary_date', 'daily_class_summary', ['date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_daily_class_summary_date', table_name='daily_class_summary')
+    op.drop_index(op.f('ix_students_class_id'), table_name='students')
+    op.drop_index('ix_schedules_class_day', table_name='schedules')
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_index('ix_attendance_date')
+        batch_op.drop_constraint('uq_attendance_student_date', type_='unique')
@@ -0,0 +1,54 @@
+from datetime import time
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.class_model import Class, Schedule
+from app.models.student import Student
+from app.models.user import User
+from app.routes.admin import dashboard_cache
+from app.services.entity_counters import rebuild_counters
+from app.services.face_gallery import SharedGallery
+from app.services.face_recognition_service import face_recognition_service
+from app.services.gallery_partitions import GalleryPartitions
+from app.services.timetable import timetable
+from app.services.user_cache import user_cache
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite database, with the per-process caches emptied"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('FACE_GALLERY_DIR', str(tmp_path / 'face_gallery'))
+    app = create_app()
+    app.config.update(TESTING=True, BCRYPT_WORKERS=0, BCRYPT_LOG_ROUNDS=4)
+    
+    face_recognition_service.gallery = SharedGallery(face_recognition_service._create_matcher)
+    face_recognition_service.partitions = GalleryPartitions()
+    timetable.invalidate()
+    dashboard_cache.invalidate()
+    user_cache.clear()
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def school(app):
+    """Class 1 scheduled 09:00-15:00 every day with students 1 and 2, and an admin (user 3)"""
+    db.session.add(Class(id=1, name='Class 1', academic_year='2024-2025', room_number='101'))
+    for day_of_week in range(7):
+        db.session.add(Schedule(class_id=1, day_of_week=day_of_week, start_time=time(9), end_time=time(15)))
+    for student_id in (1, 2):
+        user = User(id=student_id, username=f'student{student_id}', email=f'student{student_id}@example.com', role='student')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.add(Student(id=student_id, user_id=student_id, roll_number=f'R{student_id}',
+                               first_name='Student', last_name=str(student_id), class_id=1))
+    db.session.add(User(id=3, username='admin', email='admin@example.com', password_hash='-', role='admin'))
+    db.session.commit()
+    rebuild_counters()  # As the migration seeds them
+    return app
+
+@pytest.fixture
+def admin_headers(school):
+    return {'Authorization': f"Bearer {create_access_token(identity=3, additional_claims={'role': 'admin'})}"}
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""The desktop attendance journal survives a torn write and fsyncs in batches."""
+import os
+import sys
+
+# The desktop attendance scripts are plain modules in their own folder, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', 'INTELLIGENT-ATTENDANCE-MANAGEMENT-SYSTEM-main',
+                                'Smart_Attendence_Management_System Project_17'))
+from attendance_journal import AttendanceJournal, read_journal
+
+def test_reopened_journal_skips_a_torn_line_and_continues_the_sequence(tmp_path):
+    path = str(tmp_path / 'attendance.journal')
+    journal = AttendanceJournal(path)
+    journal.append(lecture='Maths', name='Alice', status='present')
+    journal.append(lecture='Maths', name='Bob', status='present')
+    journal.close()
+    
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"seq": 3, "lecture": "Ma')  # A crash in the middle of a write
+    
+    journal = AttendanceJournal(path)
+    assert journal.append(lecture='Maths', name='Carol', status='present') == 3
+    journal.close()
+    
+    records = list(read_journal(path))
+    assert [record['seq'] for record in records] == [1, 2, 3]
+    assert [record['name'] for record in records] == ['Alice', 'Bob', 'Carol']
+
+def test_records_are_fsynced_every_sync_every_appends_and_on_close(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: synced.append(fd) or fsync(fd))
+    
+    journal = AttendanceJournal(str(tmp_path / 'attendance.journal'), sync_every=2, sync_interval=3600)
+    journal.append(name='Alice')
+    assert len(synced) == 0
+    journal.append(name='Bob')
+    assert len(synced) == 1
+    journal.append(name='Carol')
+    journal.close()
+    assert len(synced) == 2
+    assert journal.unsynced == 0
\ No newline at end of file
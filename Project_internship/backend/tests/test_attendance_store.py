@@ -0,0 +1,37 @@
+"""Desktop camera processes sharing an attendance file never mark a person twice in a day."""
+import os
+import sys
+from datetime import datetime, timedelta
+
+# The desktop attendance scripts are plain modules in their own folder, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', 'INTELLIGENT-ATTENDANCE-MANAGEMENT-SYSTEM-main',
+                                'Smart_Attendence_Management_System Project_17'))
+from attendance_store import AttendanceStore
+
+def test_store_catches_up_with_lines_another_process_appended(tmp_path):
+    path = str(tmp_path / 'attendance.txt')
+    first = AttendanceStore(path)
+    second = AttendanceStore(path)
+    
+    assert first.mark('Alice')
+    assert not second.is_marked('Alice')  # Not read yet, only appends catch up
+    assert not second.mark('Alice')
+    assert second.is_marked('Alice')
+    
+    assert second.mark('Bob')
+    assert not first.mark('Bob')
+    
+    with open(path, encoding='utf-8') as file:
+        assert [line.split(', ')[0] for line in file] == ['Alice', 'Bob']
+
+def test_store_only_loads_todays_names(tmp_path):
+    path = str(tmp_path / 'attendance.txt')
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    today = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(f"Alice, {yesterday}, present\nBob, {today}, present\n")
+    
+    store = AttendanceStore(path)
+    assert store.marked == {'Bob'}
+    assert store.mark('Alice')
+    assert not store.mark('Bob')
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""A batch sent again under the same Idempotency-Key is replayed, not applied twice."""
+import gzip
+import json
+from datetime import datetime, time
+from app.models.attendance import Attendance
+
+def test_batch_resent_with_the_same_key_is_replayed(school, admin_headers):
+    client = school.test_client()
+    timestamp = datetime.combine(datetime.now().date(), time(10)).isoformat()
+    body = gzip.compress(json.dumps({'events': [
+        {'student_id': 1, 'timestamp': timestamp, 'attendance_type': 'card'},
+        {'student_id': 2, 'timestamp': timestamp, 'attendance_type': 'card'}
+    ]}).encode('utf-8'))
+    headers = {**admin_headers, 'Content-Type': 'application/json', 'Content-Encoding': 'gzip', 'Idempotency-Key': 'batch-1'}
+    
+    first = client.post('/api/attendance/record/batch', data=body, headers=headers).get_json()
+    second = client.post('/api/attendance/record/batch', data=body, headers=headers).get_json()
+    
+    assert first['recorded'] == 2
+    assert not first['replayed']
+    assert second['replayed']
+    assert second['results'] == first['results']
+    assert Attendance.query.count() == 2
+    assert all(record.punch_out_time is None for record in Attendance.query.all())  # Not taken as punch-outs
+    
+    third = client.post('/api/attendance/record/batch', data=body,
+                        headers={**headers, 'Idempotency-Key': 'batch-2'}).get_json()
+    assert not third['replayed']
+    assert third['recorded'] == 2  # A new key is a new batch, it punches both students out
+    assert all(record.punch_out_time is not None for record in Attendance.query.all())
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""The kiosk agent keeps a batch queued until the backend acknowledges it, and resends it under the same key."""
+import os
+import sys
+from datetime import datetime, time
+import pytest
+from app.models.attendance import Attendance
+
+# The desktop attendance scripts are plain modules in their own folder, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', 'INTELLIGENT-ATTENDANCE-MANAGEMENT-SYSTEM-main',
+                                'Smart_Attendence_Management_System Project_17'))
+from kiosk_agent import KioskAgent, PunchQueue, SyncError
+
+@pytest.fixture
+def agent(school, admin_headers, tmp_path):
+    """An agent whose requests go to the test client, with one punch of student 1 queued"""
+    queue = PunchQueue(str(tmp_path / 'kiosk_queue.db'))
+    queue.enqueue(1, datetime.combine(datetime.now().date(), time(10)).isoformat())
+    agent = KioskAgent(queue, 'http://backend', token=admin_headers['Authorization'].split()[1])
+    yield agent
+    queue.close()
+
+def send(client, path, body, headers):
+    response = client.post(path, data=body, headers=headers)
+    return response.status_code, response.headers, response.get_json()
+
+def test_batch_whose_response_was_lost_is_resent_and_replayed(school, agent, monkeypatch):
+    client = school.test_client()
+    
+    def lose_response(path, body, headers):
+        send(client, path, body, headers)  # The backend records the batch...
+        raise SyncError("Backend unreachable: timed out")  # ...but the kiosk never hears back
+    
+    monkeypatch.setattr(agent, '_request', lose_response)
+    key, _ = agent.queue.next_batch(agent.batch_size)
+    with pytest.raises(SyncError):
+        agent.sync_once()
+    assert agent.queue.pending()[0] == 1
+    assert agent.queue.next_batch(agent.batch_size)[0] == key
+    
+    monkeypatch.setattr(agent, '_request', lambda path, body, headers: send(client, path, body, headers))
+    assert agent.sync_once() == 1
+    assert agent.stats.replayed == 1
+    assert agent.queue.pending()[0] == 0
+    
+    records = Attendance.query.all()
+    assert [record.student_id for record in records] == [1]
+    assert records[0].punch_out_time is None  # Not applied a second time as a punch-out
+
+def test_batch_refused_with_503_stays_queued(school, agent, monkeypatch):
+    monkeypatch.setattr(agent, '_request', lambda path, body, headers: (503, {'Retry-After': '2'}, {'error': 'Busy'}))
+    with pytest.raises(SyncError) as error:
+        agent.sync_once()
+    assert error.value.retry_after == 2.0
+    assert agent.queue.pending()[0] == 1
+    
+    client = school.test_client()
+    monkeypatch.setattr(agent, '_request', lambda path, body, headers: send(client, path, body, headers))
+    assert agent.sync_once() == 1
+    assert agent.stats.replayed == 0
+    assert Attendance.query.count() == 1
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Listings stay plain lists for clients that do not ask for pages."""
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.attendance import Attendance
+
+def test_class_roster_is_a_list_unless_paged(school, admin_headers):
+    client = school.test_client()
+    
+    roster = client.get('/api/students/class/1', headers=admin_headers).get_json()
+    assert [student['id'] for student in roster] == [1, 2]
+    
+    first = client.get('/api/students/class/1?limit=1', headers=admin_headers).get_json()
+    second = client.get(f"/api/students/class/1?cursor={first['next_cursor']}", headers=admin_headers).get_json()
+    assert [student['id'] for student in first['items']] == [1]
+    assert [student['id'] for student in second['items']] == [2]
+    assert second['next_cursor'] is None
+
+def test_student_attendance_is_a_list_unless_paged(school, admin_headers):
+    for days_ago in (0, 1):
+        day = date.today() - timedelta(days=days_ago)
+        db.session.add(Attendance(student_id=1, date=day, punch_in_time=datetime.combine(day, datetime.min.time()),
+                                  status='present', attendance_type='face'))
+    db.session.commit()
+    client = school.test_client()
+    
+    records = client.get('/api/attendance/student/1', headers=admin_headers).get_json()
+    assert [record['date'] for record in records] == [date.today().isoformat(), (date.today() - timedelta(days=1)).isoformat()]
+    
+    page = client.get('/api/attendance/student/1?limit=1', headers=admin_headers).get_json()
+    assert [record['date'] for record in page['items']] == [date.today().isoformat()]
+    assert page['next_cursor'] is not None
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""The hot attendance, roster, login and dashboard queries are served by indexes.
+
+Every SELECT, UPDATE and DELETE a code path sends is run through SQLite's
+EXPLAIN QUERY PLAN, and a plan that scans a whole table instead of searching an
+index fails the test.
+"""
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import db
+from app.models.attendance import Attendance
+from app.services.attendance_service import AttendanceService
+
+# "SCAN attendance" (or "SCAN TABLE attendance" before SQLite 3.36) without an index
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)\b(?! USING)')
+
+# Tables read in full on purpose, not on every request
+EXPECTED_SCANS = {
+    'schedules': 'the timetable cache loads every schedule at once',
+    'entity_counters': 'one row per counted table'
+}
+
+@contextmanager
+def recorded_statements():
+    """Collect the distinct SELECT, UPDATE and DELETE statements (with their parameters) sent in the block"""
+    statements = {}
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            statements.setdefault(statement, parameters)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def unexpected_scans(statement, parameters):
+    """Tables the statement reads in full, other than EXPECTED_SCANS, and its plan"""
+    connection = db.engine.raw_connection()
+    try:
+        plan = [row[-1] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    finally:
+        connection.close()
+    
+    # A scan in the ORDER BY order (no sort step) stops after LIMIT rows
+    if 'LIMIT' in statement and not any('TEMP B-TREE' in line for line in plan):
+        return [], plan
+    scans = [table for line in plan for table in FULL_SCAN.findall(line)]
+    return [table for table in scans if table not in EXPECTED_SCANS], plan
+
+def record_twice(client, service):
+    service.record_attendance(1, 'face')
+    service.record_attendance(1, 'face')
+
+def record_batch(client, service):
+    service.record_attendance_batch([
+        {'student_id': 2, 'timestamp': datetime.now().isoformat(), 'attendance_type': 'card'}
+    ])
+
+def student_attendance_pages(client, service):
+    week_ago = date.today() - timedelta(days=7)
+    _, cursor = service.get_student_attendance(1, week_ago, date.today(), limit=1)
+    assert cursor is not None
+    service.get_student_attendance(1, week_ago, date.today(), limit=1, cursor=cursor)
+
+def class_reports(client, service):
+    week_ago = date.today() - timedelta(days=7)
+    service.get_class_attendance(1, date.today())
+    service.generate_attendance_report(1, week_ago, date.today())
+    service.rebuild_daily_summaries(week_ago, date.today(), class_id=1)
+    service.get_class_summary(1, week_ago, date.today())
+
+def exports(client, service):
+    week_ago = date.today() - timedelta(days=7)
+    list(service.iter_attendance_export(week_ago, date.today(), class_id=1))
+    list(service.iter_attendance_export(week_ago, date.today(), student_id=1))
+
+def login_and_register(client, service):
+    client.post('/api/auth/login', json={'email': 'student1@example.com', 'password': 'secret'})
+    client.post('/api/auth/register', json={'username': 'student1', 'email': 'new@example.com',
+                                            'password': 'secret', 'role': 'student'})
+
+def class_roster_pages(client, service):
+    headers = {'Authorization': f'Bearer {create_access_token(identity=1)}'}
+    response = client.get('/api/students/class/1?limit=1', headers=headers)
+    client.get(f"/api/students/class/1?limit=1&cursor={response.get_json()['next_cursor']}", headers=headers)
+
+def admin_dashboard(client, service):
+    client.get('/api/admin/dashboard', headers={
+        'Authorization': f"Bearer {create_access_token(identity=3, additional_claims={'role': 'admin'})}"
+    })
+
+CODE_PATHS = [
+    record_twice, record_batch, student_attendance_pages, class_reports,
+    exports, login_and_register, class_roster_pages, admin_dashboard
+]
+
+@pytest.fixture
+def history(school):
+    """Two earlier days of attendance for student 1, so listings have a second page"""
+    for days_ago in (1, 2):
+        day = date.today() - timedelta(days=days_ago)
+        db.session.add(Attendance(student_id=1, date=day, punch_in_time=datetime.combine(day, time(9)),
+                                  status='present', attendance_type='face'))
+    db.session.commit()
+    return school
+
+@pytest.mark.parametrize('code_path', CODE_PATHS, ids=lambda code_path: code_path.__name__)
+def test_queries_use_indexes(history, code_path):
+    with recorded_statements() as statements:
+        code_path(history.test_client(), AttendanceService())
+    
+    assert statements
+    for statement, parameters in statements.items():
+        scans, plan = unexpected_scans(statement, parameters)
+        assert not scans, f"full scan of {', '.join(scans)}: {' '.join(statement.split())}\n" + '\n'.join(plan)
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""A roll call punches recognized students in and never punches them out."""
+import numpy as np
+from app import db
+from app.models.attendance import Attendance
+from app.models.face_encoding import FaceEncoding
+from app.routes import attendance as routes
+from app.services.face_recognition_service import face_recognition_service
+
+def test_roll_call_taken_twice_keeps_students_present(school, admin_headers, monkeypatch):
+    faces = []
+    for student_id in (1, 2):
+        encoding = np.zeros(128, dtype=np.float32)
+        encoding[student_id] = 1.0
+        db.session.add(FaceEncoding(student_id=student_id, encoding=encoding.tobytes()))
+        faces.append(encoding)
+    db.session.commit()
+    face_recognition_service.load_gallery()
+    monkeypatch.setattr(routes.recognition_queue, 'encode', lambda app, image_data, timeout=None, reduction=None: faces)
+    
+    client = school.test_client()
+    first = client.post('/api/attendance/roll-call/1', json={'image': 'photo'}, headers=admin_headers).get_json()
+    second = client.post('/api/attendance/roll-call/1', json={'image': 'photo'}, headers=admin_headers).get_json()
+    
+    assert [face['student_id'] for face in first['recognized']] == [1, 2]
+    assert all(face['success'] for face in first['recognized'])
+    assert first['already_present'] == []
+    
+    assert [face['student_id'] for face in second['recognized']] == [1, 2]
+    assert [face['message'] for face in second['recognized']] == ['Already present', 'Already present']
+    assert second['already_present'] == [1, 2]
+    assert second['not_seen'] == []
+    
+    records = Attendance.query.order_by(Attendance.student_id).all()
+    assert [record.student_id for record in records] == [1, 2]
+    assert all(record.punch_out_time is None for record in records)
\ No newline at end of file